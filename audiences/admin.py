@@ -1,12 +1,11 @@
-from django.contrib import admin
-from audiences.models import Source, Audience, Subscriber
-
+from urllib.parse import urlencode
 
-class SubscriberInline(admin.TabularInline):
-    model = Subscriber
-    extra = 0
-    fields = ["email", "first_name", "last_name", "phone", "source", "created_at"]
-    readonly_fields = ["created_at"]
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+from audiences import stats
+from audiences.models import Source, Audience, Subscriber, SubscriberDailyStat
+from core.paginator import EstimatedCountPaginator
 
 
 @admin.register(Source)
@@ -18,17 +17,58 @@ class SourceAdmin(admin.ModelAdmin):
 
 @admin.register(Audience)
 class AudienceAdmin(admin.ModelAdmin):
-    list_display = ["name", "audience_type", "is_active", "created_at"]
+    list_display = ["name", "audience_type", "is_active", "created_at", "subscribers_link"]
     list_filter = ["audience_type", "is_active"]
     search_fields = ["name"]
-    readonly_fields = ["created_at", "updated_at"]
-    inlines = [SubscriberInline]
+    readonly_fields = ["created_at", "updated_at", "subscribers_link"]
+
+    @admin.display(description="Subscribers")
+    def subscribers_link(self, obj):
+        """Link to the paginated subscriber list of the audience, instead of an inline of all of them."""
+        if obj.pk is None:
+            return "—"
+        url = reverse("admin:audiences_subscriber_changelist")
+        query = urlencode({"audience__id__exact": obj.pk})
+        return format_html('<a href="{}?{}">View subscribers</a>', url, query)
 
 
 @admin.register(Subscriber)
 class SubscriberAdmin(admin.ModelAdmin):
     list_display = ["email", "audience", "first_name", "last_name", "source", "created_at"]
     list_filter = ["audience", "source", "audience__audience_type"]
+    list_select_related = ["audience", "source"]
     search_fields = ["email", "first_name", "last_name"]
     readonly_fields = ["created_at", "updated_at"]
     raw_id_fields = ["audience", "source"]
+    paginator = EstimatedCountPaginator
+    # Don't count the whole table on top of the filtered results
+    show_full_result_count = False
+
+
+@admin.register(SubscriberDailyStat)
+class SubscriberDailyStatAdmin(admin.ModelAdmin):
+    """Read-only view of the daily rollup, with the totals of the filtered days."""
+
+    list_display = ["day", "audience", "source", "subscribers", "integrations_succeeded", "integrations_failed"]
+    list_filter = ["audience", "source"]
+    list_select_related = ["audience", "source"]
+    date_hierarchy = "day"
+    ordering = ["-day", "audience", "source"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            changelist = response.context_data["cl"]
+        except (AttributeError, KeyError):
+            return response
+        response.context_data["summary"] = stats.totals(changelist.queryset)
+        return response
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AudiencesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "audiences"
+
+    def ready(self):
+        import audiences.signals  # noqa: F401
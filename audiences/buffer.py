@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError
+from redis.exceptions import ResponseError
+
+from audiences.services import bulk_create_subscribers, get_or_create_source
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+DRAIN_GROUP = "drain"
+
+# Entries read by a consumer that died are reclaimed after this many milliseconds
+RECLAIM_IDLE_MS = 60_000
+
+
+def enqueue_submission(validated_data, source_domain=None):
+    """Append a validated submission to the ingestion stream and return its id."""
+    submission_id = str(uuid.uuid4())
+    payload = {
+        "id": submission_id,
+        "data": validated_data,
+        "source": source_domain,
+    }
+    get_redis().xadd(
+        settings.SUBSCRIBER_BUFFER_STREAM, {"payload": json.dumps(payload)}
+    )
+    return submission_id
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(
+            settings.SUBSCRIBER_BUFFER_STREAM, DRAIN_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as exc:
+        # BUSYGROUP: the group already exists
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _insert_entries(entries):
+    """Bulk-insert a chunk of stream entries, grouped by source domain."""
+    by_source = defaultdict(list)
+    for _, fields in entries:
+        payload = json.loads(fields[b"payload"])
+        by_source[payload["source"]].append(payload)
+
+    for domain, payloads in by_source.items():
+        created, duplicates = bulk_create_subscribers(
+            [payload["data"] for payload in payloads],
+            source=get_or_create_source(domain),
+        )
+        for position, detail in duplicates:
+            log.info(
+                f"Skipped buffered submission {payloads[position]['id']}: {detail}"
+            )
+        log.debug(f"Inserted {len(created)} buffered submissions from {domain}")
+
+
+def _insert_each(client, entries):
+    """
+    Insert the entries of a failed chunk one by one. Those that fail on their
+    own (e.g. a malformed payload) are moved to the dead-letter stream, so that
+    they don't block the drain. Database outages are raised, leaving the chunk
+    to the next drain.
+    """
+    for entry_id, fields in entries:
+        try:
+            _insert_entries([(entry_id, fields)])
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as exc:
+            log.exception(f"Dead-lettered buffered submission {entry_id}")
+            client.xadd(
+                settings.SUBSCRIBER_BUFFER_DEAD_LETTER_STREAM,
+                {**fields, "entry_id": entry_id, "error": repr(exc)},
+            )
+
+
+def drain(chunk_size=None):
+    """
+    Move buffered submissions from the Redis stream into Subscriber, one chunk
+    at a time, until the stream is empty. Entries are only acknowledged once
+    their chunk is committed, so a crashed drain is picked up by the next one.
+    A chunk that fails is retried entry by entry, see _insert_each().
+    Returns the number of entries processed.
+    """
+    client = get_redis()
+    stream = settings.SUBSCRIBER_BUFFER_STREAM
+    chunk_size = chunk_size or settings.SUBSCRIBER_BUFFER_DRAIN_CHUNK
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    _ensure_group(client)
+
+    # Take over entries left unacknowledged by a consumer that died
+    reclaimed = client.xautoclaim(
+        stream, DRAIN_GROUP, consumer, min_idle_time=RECLAIM_IDLE_MS, count=chunk_size
+    )[1]
+    processed = 0
+    while True:
+        if reclaimed:
+            entries, reclaimed = reclaimed, None
+        else:
+            response = client.xreadgroup(
+                DRAIN_GROUP, consumer, {stream: ">"}, count=chunk_size
+            )
+            entries = response[0][1] if response else []
+        if not entries:
+            return processed
+
+        try:
+            _insert_entries(entries)
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception:
+            log.exception(f"Failed to insert a chunk of {len(entries)} submissions")
+            failed = True
+        else:
+            failed = False
+        if failed:
+            _insert_each(client, entries)
+        entry_ids = [entry_id for entry_id, _ in entries]
+        client.xack(stream, DRAIN_GROUP, *entry_ids)
+        client.xdel(stream, *entry_ids)
+        processed += len(entries)
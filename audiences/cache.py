@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import RedisError
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """A small thread-safe, per-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# First tier: per-process, no network round trip. Entries are short-lived since
+# invalidations only reach the local tier of the process that made the change.
+local_cache = LRUCache(
+    maxsize=settings.RESOLUTION_CACHE_LOCAL_SIZE,
+    ttl=settings.RESOLUTION_CACHE_LOCAL_TTL,
+)
+
+
+def audience_key(name, audience_type):
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return f"audiences:audience:{audience_type}:{digest}"
+
+
+def source_key(domain):
+    digest = hashlib.sha1(domain.encode()).hexdigest()
+    return f"audiences:source:{digest}"
+
+
+def lookup(key):
+    """Look a key up in the local tier, then in the shared (Redis) tier."""
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+
+    try:
+        value = cache.get(key)
+    except RedisError as exc:
+        log.warning(f"Resolution cache unavailable: {exc}")
+        return None
+
+    if value is not None:
+        local_cache.set(key, value)
+    return value
+
+
+def _store(key, value):
+    local_cache.set(key, value)
+    try:
+        cache.set(key, value, timeout=settings.RESOLUTION_CACHE_TTL)
+    except RedisError as exc:
+        log.warning(f"Resolution cache unavailable: {exc}")
+
+
+def store(key, value):
+    """
+    Cache a row once the current transaction commits, so that a row created by
+    a transaction that rolls back is never handed out.
+    """
+    transaction.on_commit(partial(_store, key, value))
+
+
+def _delete(keys):
+    for key in keys:
+        local_cache.delete(key)
+    try:
+        cache.delete_many(keys)
+    except RedisError as exc:
+        log.warning(f"Resolution cache unavailable: {exc}")
+
+
+def invalidate(*keys):
+    """
+    Drop keys from both tiers, and again once the current transaction commits:
+    until then, other processes still read the previous row and may cache it.
+    """
+    _delete(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_delete, keys))
@@ -0,0 +1,178 @@
+import csv
+import json
+import re
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, F, Func
+
+# Exported columns and the values() lookups they're read from
+COLUMNS = {
+    "id": "id",
+    "email": "email",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "phone": "phone",
+    "message": "message",
+    "audience": "audience__name",
+    "audience_type": "audience__audience_type",
+    "source": "source__domain",
+    "created_at": "created_at",
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Cells starting with these are run as formulas by spreadsheet applications,
+# unless they're just a number like a phone number
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+NUMBER = re.compile(r"^[+-]?[\d\s().-]+$")
+
+
+class Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    """
+    Iterate the subscribers as dicts, in chunks through a server-side cursor so
+    that memory stays flat regardless of the number of rows.
+    """
+    return (
+        queryset.order_by("id")
+        .values(*COLUMNS.values(), "custom_data")
+        .iterator(chunk_size=settings.SUBSCRIBER_EXPORT_CHUNK_SIZE)
+    )
+
+
+def custom_data_keys(queryset):
+    """Return the sorted top-level keys of the subscribers' custom_data."""
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == "postgresql":
+        keys = (
+            queryset.annotate(
+                custom_data_type=Func(
+                    F("custom_data"), function="jsonb_typeof", output_field=CharField()
+                )
+            )
+            .filter(custom_data_type="object")
+            .annotate(
+                key=Func(
+                    F("custom_data"),
+                    function="jsonb_object_keys",
+                    output_field=CharField(),
+                )
+            )
+            .values_list("key", flat=True)
+            .distinct()
+        )
+        return sorted(keys)
+
+    keys = set()
+    for custom_data in queryset.values_list("custom_data", flat=True).iterator(
+        chunk_size=settings.SUBSCRIBER_EXPORT_CHUNK_SIZE
+    ):
+        if isinstance(custom_data, dict):
+            keys.update(custom_data)
+    return sorted(keys)
+
+
+def _is_formula(value):
+    return value.startswith(FORMULA_PREFIXES) and not NUMBER.match(value)
+
+
+def escape_formula(value):
+    """
+    Prefix a cell that spreadsheet applications would run as a formula with a
+    quote. Cells that already look escaped get one more, so that
+    unescape_formula() gives every value back.
+    """
+    if _is_formula(value.lstrip("'")):
+        return f"'{value}"
+    return value
+
+
+def unescape_formula(value):
+    """Undo escape_formula() on a cell read from a CSV export."""
+    if value.startswith("'") and _is_formula(value.lstrip("'")):
+        return value[1:]
+    return value
+
+
+def custom_data_cell(value):
+    """
+    Write a custom_data value as JSON, except for strings that don't read as
+    JSON, which are kept as they are. parse_custom_data_cell() gives back the
+    same value and type, e.g. 30 and "30" stay distinct.
+    """
+    if isinstance(value, str) and value:
+        try:
+            json.loads(value)
+        except ValueError:
+            return value
+    return json.dumps(value)
+
+
+def parse_custom_data_cell(cell):
+    """Read a custom_data value written by custom_data_cell()."""
+    try:
+        return json.loads(cell)
+    except ValueError:
+        return cell
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    elif not isinstance(value, str):
+        value = str(value)
+    return escape_formula(value)
+
+
+def stream_csv(queryset):
+    """
+    Yield the subscribers as CSV lines, with one "custom_data.<key>" column per
+    custom_data key found in the export. Subscribers without the key get an
+    empty cell.
+    """
+    keys = custom_data_keys(queryset)
+    writer = csv.writer(Echo())
+
+    yield writer.writerow(list(COLUMNS) + [f"custom_data.{key}" for key in keys])
+    for row in _rows(queryset):
+        custom_data = row["custom_data"]
+        if not isinstance(custom_data, dict):
+            custom_data = {}
+        yield writer.writerow(
+            [_cell(row[lookup]) for lookup in COLUMNS.values()]
+            + [
+                _cell(custom_data_cell(custom_data[key])) if key in custom_data else ""
+                for key in keys
+            ]
+        )
+
+
+def stream_ndjson(queryset):
+    """Yield the subscribers as NDJSON lines, custom_data as a nested object."""
+    for row in _rows(queryset):
+        subscriber = {column: row[lookup] for column, lookup in COLUMNS.items()}
+        subscriber["created_at"] = subscriber["created_at"].isoformat()
+        subscriber["custom_data"] = row["custom_data"]
+        yield json.dumps(subscriber) + "\n"
+
+
+def stream(queryset, export_format):
+    """Yield the lines of an export in one of FORMATS."""
+    if export_format == "csv":
+        return stream_csv(queryset)
+    return stream_ndjson(queryset)
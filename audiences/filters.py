@@ -0,0 +1,35 @@
+import django_filters
+
+from audiences.models import Subscriber, SubscriberDailyStat
+
+
+class SubscriberFilter(django_filters.FilterSet):
+    """Select subscribers by audience, source domain, email and creation date range."""
+
+    audience = django_filters.NumberFilter(field_name="audience_id")
+    source = django_filters.CharFilter(field_name="source__domain")
+    # Case-insensitive, through the UPPER(email) index
+    email = django_filters.CharFilter(field_name="email", lookup_expr="iexact")
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="gte"
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="lt"
+    )
+
+    class Meta:
+        model = Subscriber
+        fields = ["audience", "source", "email", "created_after", "created_before"]
+
+
+class SubscriberDailyStatFilter(django_filters.FilterSet):
+    """Select daily subscriber stats by audience, source domain and day range."""
+
+    audience = django_filters.NumberFilter(field_name="audience_id")
+    source = django_filters.CharFilter(field_name="source__domain")
+    since = django_filters.DateFilter(field_name="day", lookup_expr="gte")
+    until = django_filters.DateFilter(field_name="day", lookup_expr="lte")
+
+    class Meta:
+        model = SubscriberDailyStat
+        fields = ["audience", "source", "since", "until"]
@@ -0,0 +1,321 @@
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_datetime
+
+from audiences import stats
+from audiences.export import parse_custom_data_cell, unescape_formula
+from audiences.models import Audience, Source, Subscriber
+from audiences.signals import subscribers_created
+
+TEXT_FIELDS = ["first_name", "last_name", "phone", "message"]
+AUDIENCE_TYPES = {audience_type for audience_type, _ in Audience.AUDIENCE_TYPES}
+
+# Characters of COPY data sent to the server per round trip
+COPY_BUFFER_SIZE = 1 << 16
+
+STAGING_TABLE = "subscriber_import"
+CREATED_TABLE = "subscriber_import_created"
+STAGING_COLUMNS = [
+    "line",
+    "audience_name",
+    "audience_type",
+    "source_domain",
+    "email",
+    "first_name",
+    "last_name",
+    "phone",
+    "message",
+    "custom_data",
+    "fingerprint",
+    "created_at",
+]
+
+
+class InvalidRow(ValueError):
+    """A row of the import file that can't become a subscriber."""
+
+
+def read_records(file, file_format):
+    """
+    Yield (line number, record) for each row of a CSV or NDJSON file. CSV
+    cells are read as written by the export: formulas escaped with a quote are
+    restored, and "custom_data.<key>" cells are JSON values unless they don't
+    parse as JSON. These and a JSON "custom_data" column are merged into a
+    custom_data dict.
+    """
+    if file_format == "ndjson":
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as exc:
+                yield line_number, InvalidRow(f"invalid JSON: {exc}")
+        return
+
+    reader = csv.DictReader(file)
+    for row in reader:
+        record = {}
+        custom_data = {}
+        for column, value in row.items():
+            if column is None or value is None:
+                continue
+            value = unescape_formula(value)
+            if column.startswith("custom_data."):
+                if value != "":
+                    key = column[len("custom_data.") :]
+                    custom_data[key] = parse_custom_data_cell(value)
+            elif column == "custom_data":
+                if value:
+                    try:
+                        record["custom_data"] = json.loads(value)
+                    except ValueError as exc:
+                        record = InvalidRow(f"invalid custom_data: {exc}")
+                        break
+            else:
+                record[column] = value
+        if isinstance(record, dict) and custom_data:
+            record["custom_data"] = {**record.get("custom_data", {}), **custom_data}
+        yield reader.line_num, record
+
+
+def clean_record(record, audience=None, audience_type=None, source=None):
+    """
+    Validate a record like SubscriberSerializer would and return the staging
+    row values, with the subscriber's fingerprint. `audience`, `audience_type`
+    and `source` are used for records that don't set them.
+    """
+    if isinstance(record, InvalidRow):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRow("expected an object")
+
+    audience_name = record.get("audience") or audience
+    if isinstance(audience_name, dict):
+        audience_type = audience_name.get("audience_type") or audience_type
+        audience_name = audience_name.get("name")
+    else:
+        audience_type = record.get("audience_type") or audience_type
+    if not audience_name:
+        raise InvalidRow("missing audience")
+    if audience_type not in AUDIENCE_TYPES:
+        raise InvalidRow(f"invalid audience type {audience_type!r}")
+    audience_name = _check_length(Audience, "name", str(audience_name))
+
+    source = record.get("source") or source or None
+    if source is not None:
+        source = _check_length(Source, "domain", str(source))
+
+    email = _check_length(Subscriber, "email", str(record.get("email") or "").strip())
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise InvalidRow(f"invalid email {email!r}")
+
+    subscriber = Subscriber(email=email, custom_data=record.get("custom_data") or {})
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        value = "" if value is None else str(value).strip()
+        setattr(subscriber, field, _check_length(Subscriber, field, value))
+
+    created_at = record.get("created_at") or None
+    if created_at is not None:
+        try:
+            created_at = parse_datetime(str(created_at))
+        except ValueError:
+            created_at = None
+        if created_at is None:
+            raise InvalidRow(f"invalid created_at {record['created_at']!r}")
+
+    return [
+        audience_name,
+        audience_type,
+        source,
+        subscriber.email,
+        subscriber.first_name,
+        subscriber.last_name,
+        subscriber.phone,
+        subscriber.message,
+        json.dumps(subscriber.custom_data),
+        subscriber.compute_fingerprint(),
+        created_at.isoformat() if created_at else None,
+    ]
+
+
+def _check_length(model, field_name, value):
+    max_length = model._meta.get_field(field_name).max_length
+    if max_length and len(value) > max_length:
+        raise InvalidRow(f"{field_name} is longer than {max_length} characters")
+    return value
+
+
+def _copy_value(value):
+    """Encode a value in the text format of COPY."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyStream:
+    """File-like object serving rows in the text format of COPY, for copy_expert()."""
+
+    def __init__(self, rows):
+        self._lines = (
+            "\t".join(_copy_value(value) for value in row) + "\n" for row in rows
+        )
+        self._buffer = ""
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = "".join(chunks)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def import_subscribers(rows):
+    """
+    Insert subscribers from staging rows (line number + clean_record() values).
+
+    The rows are streamed into a temporary table with COPY. Missing audiences
+    and sources are then created set-wise, and the subscribers inserted in one
+    INSERT ... SELECT. The duplicate rules of SubscriberSerializer are applied
+    by the database through the same unique constraints, with ON CONFLICT DO
+    NOTHING, in file order: the first of several identical rows wins, and so
+    does the first row of an email in audiences that don't allow duplicates.
+
+    Returns (staged, created). The ids of the new subscribers are kept in a
+    temporary table until drop_staging(), see created_ids().
+    """
+    if connection.vendor != "postgresql":
+        raise NotImplementedError("Importing subscribers requires PostgreSQL")
+
+    audience_table = Audience._meta.db_table
+    source_table = Source._meta.db_table
+    subscriber_table = Subscriber._meta.db_table
+
+    with connection.cursor() as cursor:
+        drop_staging()
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} ("
+            " line bigint NOT NULL, audience_name text NOT NULL,"
+            " audience_type text NOT NULL, source_domain text, email text NOT NULL,"
+            " first_name text NOT NULL, last_name text NOT NULL, phone text NOT NULL,"
+            " message text NOT NULL, custom_data jsonb NOT NULL,"
+            " fingerprint text NOT NULL, created_at timestamptz)"
+        )
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {CREATED_TABLE} (id bigint PRIMARY KEY)"
+        )
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+            CopyStream(rows),
+            COPY_BUFFER_SIZE,
+        )
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+        cursor.execute(f"SELECT count(*) FROM {STAGING_TABLE}")
+        staged = cursor.fetchone()[0]
+
+        with transaction.atomic():
+            cursor.execute(
+                f"INSERT INTO {audience_table}"
+                " (name, audience_type, description, is_active, allow_duplicates,"
+                " created_at, updated_at)"
+                " SELECT DISTINCT audience_name, audience_type, '', true, true, now(), now()"
+                f" FROM {STAGING_TABLE} ON CONFLICT DO NOTHING"
+            )
+            cursor.execute(
+                f"INSERT INTO {source_table} (domain, description, created_at, updated_at)"
+                " SELECT DISTINCT source_domain, '', now(), now()"
+                f" FROM {STAGING_TABLE} WHERE source_domain IS NOT NULL"
+                " ON CONFLICT DO NOTHING"
+            )
+            cursor.execute(
+                f"WITH inserted AS ("
+                f" INSERT INTO {subscriber_table}"
+                " (audience_id, email, first_name, last_name, phone, message,"
+                " custom_data, source_id, fingerprint, unique_email, created_at,"
+                " updated_at)"
+                " SELECT audience.id, staged.email, staged.first_name,"
+                " staged.last_name, staged.phone, staged.message, staged.custom_data,"
+                " source.id, staged.fingerprint, NOT audience.allow_duplicates,"
+                " coalesce(staged.created_at, now()), now()"
+                f" FROM {STAGING_TABLE} staged"
+                f" JOIN {audience_table} audience"
+                " ON audience.name = staged.audience_name"
+                " AND audience.audience_type = staged.audience_type"
+                f" LEFT JOIN {source_table} source"
+                " ON source.domain = staged.source_domain"
+                " ORDER BY staged.line"
+                " ON CONFLICT DO NOTHING RETURNING id)"
+                f" INSERT INTO {CREATED_TABLE} SELECT id FROM inserted"
+            )
+            created = cursor.rowcount
+            stats.record_subscribers(
+                Subscriber.objects.filter(
+                    id__in=RawSQL(f"SELECT id FROM {CREATED_TABLE}", [])
+                )
+            )
+
+    return staged, created
+
+
+def created_ids(chunk_size):
+    """Yield the ids of the subscribers created by the last import, in chunks."""
+    last_id = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {CREATED_TABLE} WHERE id > %s ORDER BY id LIMIT %s",
+                [last_id, chunk_size],
+            )
+            ids = [subscriber_id for (subscriber_id,) in cursor.fetchall()]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def drop_staging():
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}, {CREATED_TABLE}")
+
+
+def dispatch_integrations(rate, on_chunk=None):
+    """
+    Run the integrations of the subscribers created by the last import, at most
+    `rate` subscribers per second (0 for no limit), in chunks of
+    INTEGRATION_DISPATCH_BATCH_SIZE. Returns the number of subscribers.
+    """
+    dispatched = 0
+    for ids in created_ids(settings.INTEGRATION_DISPATCH_BATCH_SIZE):
+        started = time.monotonic()
+        subscribers_created.send(sender=Subscriber, subscriber_ids=ids)
+        dispatched += len(ids)
+        if on_chunk:
+            on_chunk(dispatched)
+        if rate:
+            time.sleep(max(0, len(ids) / rate - (time.monotonic() - started)))
+    return dispatched
@@ -0,0 +1,110 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from audiences import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import subscribers from a CSV or NDJSON file, as written by "
+        "export_subscribers. Rows are streamed into a staging table with COPY and "
+        "inserted in one statement, skipping duplicates like the API does."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="File to import, or - for standard input")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            dest="import_format",
+            help="File format (default: from the file extension, else csv)",
+        )
+        parser.add_argument("--audience", help="Audience name of rows without one")
+        parser.add_argument(
+            "--audience-type",
+            help="Audience type of rows without one, e.g. newsletter",
+        )
+        parser.add_argument("--source", help="Source domain of rows without one")
+        parser.add_argument(
+            "--integrations",
+            action="store_true",
+            help="Run the integrations of the imported subscribers (default: don't)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=100,
+            help=(
+                "With --integrations, dispatch at most this many subscribers per "
+                "second, 0 for no limit (default: 100)"
+            ),
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=20,
+            help="Invalid rows to report (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Importing subscribers requires PostgreSQL")
+
+        import_format = options["import_format"]
+        if not import_format:
+            import_format = (
+                "ndjson" if options["file"].endswith((".ndjson", ".jsonl")) else "csv"
+            )
+
+        self.invalid = 0
+        try:
+            if options["file"] == "-":
+                staged, created = self._import(sys.stdin, import_format, options)
+            else:
+                try:
+                    file = open(options["file"], encoding="utf-8-sig", newline="")
+                except OSError as exc:
+                    raise CommandError(exc)
+                with file:
+                    staged, created = self._import(file, import_format, options)
+
+            self.stdout.write(
+                f"Imported {created} subscribers: {staged - created} duplicates "
+                f"and {self.invalid} invalid rows skipped"
+            )
+            if options["integrations"] and created:
+                dispatched = importer.dispatch_integrations(
+                    options["rate"],
+                    on_chunk=lambda count: self.stderr.write(
+                        f"Dispatched integrations of {count}/{created} subscribers"
+                    ),
+                )
+                self.stdout.write(
+                    f"Dispatched integrations of {dispatched} subscribers"
+                )
+        finally:
+            importer.drop_staging()
+
+    def _import(self, file, import_format, options):
+        return importer.import_subscribers(
+            self._rows(importer.read_records(file, import_format), options)
+        )
+
+    def _rows(self, records, options):
+        """Yield the staging rows of the valid records, reporting the others."""
+        for line, record in records:
+            try:
+                values = importer.clean_record(
+                    record,
+                    audience=options["audience"],
+                    audience_type=options["audience_type"],
+                    source=options["source"],
+                )
+            except importer.InvalidRow as exc:
+                self.invalid += 1
+                if self.invalid <= options["max_errors"]:
+                    self.stderr.write(f"Line {line}: {exc}")
+                continue
+            yield [line, *values]
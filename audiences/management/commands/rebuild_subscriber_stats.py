@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from audiences import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily subscriber stats from the subscribers and "
+        "integration logs, e.g. after deleting subscribers. Days are swapped in "
+        "a few at a time, without blocking new subscribers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--until", help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        try:
+            since, until = (
+                date.fromisoformat(options[name]) if options[name] else None
+                for name in ["since", "until"]
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        rows = stats.rebuild(since, until)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily stats"))
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_audiences_and_sources(apps, schema_editor):
+    """
+    Merge rows that would violate the new unique constraints into the oldest one.
+    Concurrent get_or_create calls could previously create duplicates.
+    """
+    Audience = apps.get_model('audiences', 'Audience')
+    Source = apps.get_model('audiences', 'Source')
+    Subscriber = apps.get_model('audiences', 'Subscriber')
+    AudienceIntegration = apps.get_model('integrations', 'AudienceIntegration')
+
+    duplicated = (
+        Audience.objects.values('name', 'audience_type')
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicated:
+        extra_ids = list(
+            Audience.objects.filter(name=group['name'], audience_type=group['audience_type'])
+            .exclude(id=group['keep_id'])
+            .values_list('id', flat=True)
+        )
+        Subscriber.objects.filter(audience_id__in=extra_ids).update(audience_id=group['keep_id'])
+
+        linked = set(
+            AudienceIntegration.objects.filter(audience_id=group['keep_id'])
+            .values_list('integration_id', flat=True)
+        )
+        for audience_integration in AudienceIntegration.objects.filter(audience_id__in=extra_ids):
+            if audience_integration.integration_id in linked:
+                audience_integration.delete()
+            else:
+                audience_integration.audience_id = group['keep_id']
+                audience_integration.save(update_fields=['audience'])
+                linked.add(audience_integration.integration_id)
+
+        Audience.objects.filter(id__in=extra_ids).delete()
+
+    duplicated = (
+        Source.objects.values('domain')
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicated:
+        extra_ids = list(
+            Source.objects.filter(domain=group['domain'])
+            .exclude(id=group['keep_id'])
+            .values_list('id', flat=True)
+        )
+        Subscriber.objects.filter(source_id__in=extra_ids).update(source_id=group['keep_id'])
+        Source.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0002_add_allow_duplicates_to_audience_remove_unique_together_subscriber'),
+        ('integrations', '0005_alter_integration_integration_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_audiences_and_sources, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='audience',
+            constraint=models.UniqueConstraint(fields=('name', 'audience_type'), name='unique_audience_name_type'),
+        ),
+        migrations.AddConstraint(
+            model_name='source',
+            constraint=models.UniqueConstraint(fields=('domain',), name='unique_source_domain'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:01
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def compute_fingerprint(subscriber):
+    # Must stay in sync with Subscriber.compute_fingerprint
+    content = json.dumps(
+        [
+            subscriber.email,
+            subscriber.first_name,
+            subscriber.last_name,
+            subscriber.phone,
+            subscriber.message,
+            subscriber.custom_data,
+        ],
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """
+    Fingerprint existing subscribers. Exact duplicates that already exist keep a
+    null fingerprint so that the unique constraint can be added; only the oldest
+    row of each group is fingerprinted.
+    """
+    Subscriber = apps.get_model('audiences', 'Subscriber')
+
+    seen = set()
+    batch = []
+    for subscriber in Subscriber.objects.order_by('id').iterator(chunk_size=2000):
+        fingerprint = compute_fingerprint(subscriber)
+        if (subscriber.audience_id, fingerprint) in seen:
+            continue
+        seen.add((subscriber.audience_id, fingerprint))
+        subscriber.fingerprint = fingerprint
+        batch.append(subscriber)
+        if len(batch) >= 2000:
+            Subscriber.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    Subscriber.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0003_unique_audience_and_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriber',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='subscriber',
+            constraint=models.UniqueConstraint(fields=('audience', 'fingerprint'), name='unique_subscriber_fingerprint'),
+        ),
+    ]
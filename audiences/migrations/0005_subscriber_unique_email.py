@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def flag_unique_emails(apps, schema_editor):
+    """Flag the oldest subscriber of each email in audiences that don't allow duplicates."""
+    Subscriber = apps.get_model('audiences', 'Subscriber')
+
+    first_ids = (
+        Subscriber.objects.filter(audience__allow_duplicates=False)
+        .values('audience_id', 'email')
+        .annotate(first_id=Min('id'))
+        .values('first_id')
+    )
+    Subscriber.objects.filter(id__in=first_ids).update(unique_email=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0004_subscriber_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscriber',
+            name='unique_email',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(flag_unique_emails, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(fields=['audience', 'email'], name='audiences_s_audienc_d19cce_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscriber',
+            constraint=models.UniqueConstraint(condition=models.Q(('unique_email', True)), fields=('audience', 'email'), name='unique_subscriber_email_per_audience', violation_error_message='A subscriber with this email already exists in this audience.'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0005_subscriber_unique_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('email'),
+                    name='text_pattern_ops',
+                ),
+                name='subscriber_email_upper_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0006_subscriber_subscriber_email_upper_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='subscriber',
+            name='audiences_s_created_f7ec6a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='subscriber',
+            index=models.Index(
+                fields=['created_at', 'id'], name='subscriber_created_id_idx'
+            ),
+        ),
+    ]
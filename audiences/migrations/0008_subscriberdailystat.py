@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0007_subscriber_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubscriberDailyStat',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('day', models.DateField()),
+                ('subscribers', models.IntegerField(db_default=0, default=0)),
+                (
+                    'integrations_succeeded',
+                    models.IntegerField(db_default=0, default=0),
+                ),
+                ('integrations_failed', models.IntegerField(db_default=0, default=0)),
+                (
+                    'audience',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='daily_stats',
+                        to='audiences.audience',
+                    ),
+                ),
+                (
+                    'source',
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='daily_stats',
+                        to='audiences.source',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'daily subscriber stat',
+                'indexes': [
+                    models.Index(fields=['day'], name='audiences_s_day_cd99b8_idx')
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('audience', 'source', 'day'),
+                        name='unique_subscriber_daily_stat',
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+    ]
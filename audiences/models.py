@@ -1,4 +1,11 @@
+import hashlib
+import json
+
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models import Exists, Min, Q
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Upper
 
 
 class Source(models.Model):
@@ -9,6 +16,11 @@ class Source(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["domain"], name="unique_source_domain"),
+        ]
+
     def __str__(self):
         return self.domain
 
@@ -32,10 +44,95 @@ class Audience(models.Model):
 
     class Meta:
         verbose_name_plural = "Audiences"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "audience_type"], name="unique_audience_name_type"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_audience_type_display()})"
 
+    def sync_unique_emails(self):
+        """
+        Flag the subscribers covered by the (audience, email) unique constraint.
+        When duplicates are disallowed, the oldest subscriber of each email is
+        flagged so that new submissions with that email conflict with it.
+        """
+        subscribers = Subscriber.objects.filter(audience=self)
+        if self.allow_duplicates:
+            subscribers.filter(unique_email=True).update(unique_email=False)
+            return
+
+        first_ids = (
+            subscribers.exclude(
+                email__in=subscribers.filter(unique_email=True).values("email")
+            )
+            .values("email")
+            .annotate(first_id=Min("id"))
+            .values("first_id")
+        )
+        Subscriber.objects.filter(id__in=first_ids).update(unique_email=True)
+
+
+class SubscriberQuerySet(models.QuerySet):
+    def insert_ignoring_conflicts(self, subscribers, batch_size=1000):
+        """
+        Insert subscribers with INSERT ... ON CONFLICT DO NOTHING.
+
+        Rows rejected by a unique constraint (e.g. an identical submission already
+        exists in the audience) are skipped by the database instead of raising.
+        unique_email is read from the audience row by the INSERT itself, since the
+        subscribers' audiences may come from the resolution cache and be stale.
+        Returns the inserted subscribers with their primary key set. Like
+        bulk_create(), this doesn't send pre_save/post_save.
+        """
+        opts = self.model._meta
+        fields = [
+            f for f in opts.concrete_fields if not f.generated and not f.primary_key
+        ]
+        returning_fields = [
+            opts.pk,
+            opts.get_field("audience"),
+            opts.get_field("fingerprint"),
+            opts.get_field("unique_email"),
+        ]
+
+        inserted = []
+        for start in range(0, len(subscribers), batch_size):
+            batch = subscribers[start : start + batch_size]
+            by_key = {}
+            for subscriber in batch:
+                subscriber.fingerprint = subscriber.compute_fingerprint()
+                subscriber.unique_email = Exists(
+                    Audience.objects.filter(
+                        pk=subscriber.audience_id, allow_duplicates=False
+                    )
+                )
+                # Identical rows within the batch: the database keeps the first one
+                by_key.setdefault(
+                    (subscriber.audience_id, subscriber.fingerprint), subscriber
+                )
+
+            rows = self._insert(
+                batch,
+                fields=fields,
+                returning_fields=returning_fields,
+                on_conflict=OnConflict.IGNORE,
+            )
+            for row in rows:
+                # A single-row insert that hit a conflict returns no row
+                if row is None:
+                    continue
+                pk, audience_id, fingerprint, unique_email = row
+                subscriber = by_key[(audience_id, fingerprint)]
+                subscriber.pk = pk
+                subscriber.unique_email = unique_email
+                subscriber._state.adding = False
+                subscriber._state.db = self.db
+                inserted.append(subscriber)
+        return inserted
+
 
 class Subscriber(models.Model):
     audience = models.ForeignKey(
@@ -54,14 +151,133 @@ class Subscriber(models.Model):
 
     # Meta
     source = models.ForeignKey(Source, on_delete=models.SET_NULL, null=True, blank=True)
+    # Digest of the submitted content, used to reject exact duplicates.
+    # Null only for exact duplicates that existed before it was introduced.
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # Set when the audience doesn't allow duplicates; only these rows are
+    # covered by the (audience, email) unique constraint.
+    unique_email = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SubscriberQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=["email"]),
-            models.Index(fields=["created_at"]),
+            # Keyset pagination of the subscriber list, newest first
+            models.Index(fields=["created_at", "id"], name="subscriber_created_id_idx"),
+            models.Index(fields=["audience", "email"]),
+            # Case-insensitive exact and prefix email searches (iexact, istartswith)
+            models.Index(
+                OpClass(Upper("email"), name="text_pattern_ops"),
+                name="subscriber_email_upper_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["audience", "fingerprint"], name="unique_subscriber_fingerprint"
+            ),
+            models.UniqueConstraint(
+                fields=["audience", "email"],
+                condition=Q(unique_email=True),
+                name="unique_subscriber_email_per_audience",
+                violation_error_message="A subscriber with this email already exists in this audience.",
+            ),
         ]
 
     def __str__(self):
         return f"{self.email} - {self.audience.name}"
+
+    def compute_fingerprint(self):
+        """Return a SHA-256 digest of every field compared for exact duplicates."""
+        content = json.dumps(
+            [
+                self.email,
+                self.first_name,
+                self.last_name,
+                self.phone,
+                self.message,
+                self.custom_data,
+            ],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def clean(self):
+        # fingerprint and unique_email aren't form fields, so ModelForm skips the
+        # constraints that use them. Validate those here for the admin.
+        if self.audience_id:
+            if self._state.adding:
+                self.unique_email = not self.audience.allow_duplicates
+            self.fingerprint = self.compute_fingerprint()
+            self.validate_constraints()
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.unique_email = not self.audience.allow_duplicates
+        self.fingerprint = self.compute_fingerprint()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "fingerprint"}
+        super().save(*args, **kwargs)
+
+
+class SubscriberDailyStat(models.Model):
+    """
+    Rollup of the subscribers created per audience, source and day, and of the
+    integration runs that completed that day for them. Counts are queued by
+    audiences.stats as subscribers and integration logs are written, and added
+    by the flush_subscriber_stats beat task, so that dashboards don't have to
+    count subscribers. Deleted or edited subscribers are only accounted for by
+    the rebuild_subscriber_stats command.
+    """
+
+    audience = models.ForeignKey(
+        Audience, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    source = models.ForeignKey(
+        Source,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_stats",
+    )
+    day = models.DateField()
+    subscribers = models.IntegerField(default=0, db_default=0)
+    integrations_succeeded = models.IntegerField(default=0, db_default=0)
+    integrations_failed = models.IntegerField(default=0, db_default=0)
+
+    class Meta:
+        verbose_name = "daily subscriber stat"
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+        constraints = [
+            # Rows without a source are unique too: counts are upserted on it
+            models.UniqueConstraint(
+                fields=["audience", "source", "day"],
+                nulls_distinct=False,
+                name="unique_subscriber_daily_stat",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.audience.name} - {self.source or 'no source'} - {self.day}"
+
+
+class SubscriberStatsFlush(models.Model):
+    """
+    Batch of queued counts added to SubscriberDailyStat, recorded in the same
+    transaction so that a batch is never added twice (see audiences.stats.flush).
+    """
+
+    flush_id = models.UUIDField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "subscriber stats flush"
+
+    def __str__(self):
+        return str(self.flush_id)
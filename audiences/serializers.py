@@ -1,7 +1,14 @@
 from rest_framework import serializers
 from rest_framework.exceptions import APIException
 
-from audiences.models import Audience, Source, Subscriber
+from audiences.models import Audience, Subscriber
+from audiences.services import (
+    get_duplicate_detail,
+    get_or_create_audience,
+    get_or_create_source,
+    get_source_domain,
+    insert_subscribers,
+)
 
 
 class ConflictError(APIException):
@@ -14,6 +21,9 @@ class AudienceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Audience
         fields = ["name", "audience_type"]
+        # Audiences are looked up or created by name, so the unique
+        # (name, audience_type) constraint must not reject existing ones
+        validators = []
 
 
 class SubscriberSerializer(serializers.ModelSerializer):
@@ -37,75 +47,23 @@ class SubscriberSerializer(serializers.ModelSerializer):
 
     def _get_or_create_audience(self, audience_data):
         """Get an existing audience or create a new one."""
-        audience, _ = Audience.objects.get_or_create(
-            name=audience_data["name"],
-            audience_type=audience_data["audience_type"],
+        return get_or_create_audience(
+            audience_data["name"], audience_data["audience_type"]
         )
-        return audience
 
     def _get_or_create_source(self):
         """Get or create a Source from the request's Origin or Referer header."""
-        request = self.context.get("request")
-        if not request:
-            return None
-
-        origin = request.META.get("HTTP_ORIGIN") or request.META.get("HTTP_REFERER", "")
-        if not origin:
-            return None
-
-        # Extract the domain from the origin/referer URL
-        from urllib.parse import urlparse
-
-        parsed = urlparse(origin)
-        domain = parsed.netloc or parsed.path
-        if not domain:
-            return None
-
-        source, _ = Source.objects.get_or_create(domain=domain)
-        return source
-
-    def validate(self, attrs):
-        audience_data = attrs.get("audience")
-        email = attrs.get("email")
-
-        if audience_data and email:
-            try:
-                audience = Audience.objects.get(
-                    name=audience_data["name"],
-                    audience_type=audience_data["audience_type"],
-                )
-                qs = Subscriber.objects.filter(audience=audience, email=email)
-
-                # Always reject exact duplicates (all subscriber fields match)
-                exact_duplicate = qs.filter(
-                    first_name=attrs.get("first_name", ""),
-                    last_name=attrs.get("last_name", ""),
-                    phone=attrs.get("phone", ""),
-                    message=attrs.get("message", ""),
-                    custom_data=attrs.get("custom_data", {}),
-                ).exists()
-                if exact_duplicate:
-                    raise ConflictError(
-                        f"An identical submission already exists for '{email}' in this audience."
-                    )
-
-                # When duplicates are not allowed, also reject on email alone
-                if not audience.allow_duplicates and qs.exists():
-                    raise ConflictError(
-                        f"A subscriber with email '{email}' already exists in this audience."
-                    )
-            except Audience.DoesNotExist:
-                pass  # New audience, no duplicate possible
-
-        return attrs
+        return get_or_create_source(get_source_domain(self.context.get("request")))
 
     def create(self, validated_data):
         audience_data = validated_data.pop("audience")
         audience = self._get_or_create_audience(audience_data)
         source = self._get_or_create_source()
-        subscriber = Subscriber.objects.create(
-            audience=audience, source=source, **validated_data
-        )
+        subscriber = Subscriber(audience=audience, source=source, **validated_data)
+
+        # Duplicates are rejected by the database's unique constraints
+        if not insert_subscribers([subscriber]):
+            raise ConflictError(get_duplicate_detail(subscriber))
         return subscriber
 
     def update(self, instance, validated_data):
@@ -118,3 +76,26 @@ class SubscriberSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+
+class SubscriberListSerializer(SubscriberSerializer):
+    """Read-only representation for the subscriber list: the source as its domain."""
+
+    audience_id = serializers.IntegerField(read_only=True)
+    source = serializers.SlugRelatedField(slug_field="domain", read_only=True)
+
+    class Meta(SubscriberSerializer.Meta):
+        fields = [
+            "id",
+            "audience_id",
+            "audience",
+            "email",
+            "first_name",
+            "last_name",
+            "phone",
+            "message",
+            "custom_data",
+            "source",
+            "created_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,157 @@
+from urllib.parse import urlparse
+
+from django.db import transaction
+
+from audiences import cache, stats
+from audiences.models import Audience, Source, Subscriber
+from audiences.signals import subscribers_created
+
+EXACT_DUPLICATE_MESSAGE = (
+    "An identical submission already exists for '{email}' in this audience."
+)
+EMAIL_DUPLICATE_MESSAGE = (
+    "A subscriber with email '{email}' already exists in this audience."
+)
+
+
+def get_source_domain(request):
+    """Extract the domain from the request's Origin or Referer header."""
+    if not request:
+        return None
+
+    origin = request.META.get("HTTP_ORIGIN") or request.META.get("HTTP_REFERER", "")
+    if not origin:
+        return None
+
+    parsed = urlparse(origin)
+    return parsed.netloc or parsed.path or None
+
+
+def get_audience(name, audience_type):
+    """Return the cached audience for (name, audience_type), or None if it doesn't exist yet."""
+    key = cache.audience_key(name, audience_type)
+    audience = cache.lookup(key)
+    if audience is None:
+        audience = Audience.objects.filter(
+            name=name, audience_type=audience_type
+        ).first()
+        if audience is not None:
+            cache.store(key, audience)
+    return audience
+
+
+def get_or_create_audience(name, audience_type):
+    """
+    Get an existing audience or create a new one.
+    The unique (name, audience_type) constraint makes concurrent first submissions
+    resolve to the same row: get_or_create retries the lookup on IntegrityError.
+    """
+    audience = get_audience(name, audience_type)
+    if audience is None:
+        audience, _ = Audience.objects.get_or_create(
+            name=name, audience_type=audience_type
+        )
+        cache.store(cache.audience_key(name, audience_type), audience)
+    return audience
+
+
+def get_or_create_source(domain):
+    """Get or create a Source for the given domain."""
+    if not domain:
+        return None
+
+    key = cache.source_key(domain)
+    source = cache.lookup(key)
+    if source is None:
+        source, _ = Source.objects.get_or_create(domain=domain)
+        cache.store(key, source)
+    return source
+
+
+def insert_subscribers(subscribers):
+    """
+    Insert subscribers in one statement, letting the database skip duplicates.
+    subscribers_created is sent for the inserted rows inside the transaction,
+    and they're counted in the daily stats once it commits.
+    """
+    with transaction.atomic():
+        created = Subscriber.objects.insert_ignoring_conflicts(subscribers)
+        if created:
+            stats.record_subscribers(
+                Subscriber.objects.filter(
+                    id__in=[subscriber.id for subscriber in created]
+                )
+            )
+            subscribers_created.send(
+                sender=Subscriber,
+                subscriber_ids=[subscriber.id for subscriber in created],
+            )
+    return created
+
+
+def get_duplicate_detail(subscriber):
+    """Explain which rule rejected a subscriber that the database skipped on insert."""
+    if Subscriber.objects.filter(
+        audience_id=subscriber.audience_id, fingerprint=subscriber.fingerprint
+    ).exists():
+        return EXACT_DUPLICATE_MESSAGE.format(email=subscriber.email)
+    return EMAIL_DUPLICATE_MESSAGE.format(email=subscriber.email)
+
+
+def bulk_create_subscribers(submissions, source=None):
+    """
+    Insert a batch of validated submissions in a single transaction.
+
+    Duplicates are rejected by the database with the same rules as
+    ``SubscriberSerializer``: exact duplicates by the (audience, fingerprint)
+    unique constraint and, for audiences that don't allow duplicates, repeated
+    emails by the (audience, email) one. Skipped rows are then explained with a
+    single query.
+
+    Returns a tuple ``(created, duplicates)`` where ``created`` is the list of new
+    subscribers and ``duplicates`` is a list of ``(position, detail)`` tuples for
+    the submissions that were skipped.
+    """
+    if not submissions:
+        return [], []
+
+    audiences = {}
+    subscribers = []
+    for submission in submissions:
+        data = dict(submission)
+        audience_data = data.pop("audience")
+        key = (audience_data["name"], audience_data["audience_type"])
+        if key not in audiences:
+            audiences[key] = get_or_create_audience(*key)
+        subscribers.append(Subscriber(audience=audiences[key], source=source, **data))
+
+    created = insert_subscribers(subscribers)
+
+    skipped = [
+        (position, subscriber)
+        for position, subscriber in enumerate(subscribers)
+        if subscriber.pk is None
+    ]
+    if not skipped:
+        return created, []
+
+    existing_fingerprints = set(
+        Subscriber.objects.filter(
+            audience__in=audiences.values(),
+            fingerprint__in={subscriber.fingerprint for _, subscriber in skipped},
+        ).values_list("audience_id", "fingerprint")
+    )
+    duplicates = []
+    for position, subscriber in skipped:
+        if (subscriber.audience_id, subscriber.fingerprint) in existing_fingerprints:
+            # Always reject exact duplicates (all subscriber fields match)
+            duplicates.append(
+                (position, EXACT_DUPLICATE_MESSAGE.format(email=subscriber.email))
+            )
+        else:
+            # The audience doesn't allow duplicates and the email is taken
+            duplicates.append(
+                (position, EMAIL_DUPLICATE_MESSAGE.format(email=subscriber.email))
+            )
+
+    return created, duplicates
@@ -0,0 +1,78 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from audiences import cache, stats
+from audiences.models import Audience, Source, Subscriber
+
+# Sent once per batch of subscribers inserted without going through Model.save()
+# (e.g. bulk_create), since post_save is not fired for those rows. Like
+# post_save, it is sent inside the inserting transaction.
+# Provides: subscriber_ids
+subscribers_created = Signal()
+
+# Sent by stats.rebuild() for each range of days it recounts, from `start` to
+# `end` (datetimes), for other apps to add their counts to the rollup. Receivers
+# return a values() queryset of rows like stats.subscriber_rows().
+# Provides: start, end
+rebuilding_subscriber_stats = Signal()
+
+
+@receiver(pre_save, sender=Audience)
+def track_audience_changes(sender, instance, **kwargs):
+    instance._allow_duplicates_changed = False
+    if instance.pk:
+        previous = (
+            Audience.objects.filter(pk=instance.pk)
+            .values("name", "audience_type", "allow_duplicates")
+            .first()
+        )
+        if previous:
+            # The cache is keyed by name, so drop the entry under the previous name too
+            cache.invalidate(
+                cache.audience_key(previous["name"], previous["audience_type"])
+            )
+            instance._allow_duplicates_changed = (
+                previous["allow_duplicates"] != instance.allow_duplicates
+            )
+
+
+@receiver(post_save, sender=Audience)
+def sync_audience_unique_emails(sender, instance, created, **kwargs):
+    if getattr(instance, "_allow_duplicates_changed", False):
+        instance.sync_unique_emails()
+
+
+@receiver(post_save, sender=Audience)
+@receiver(post_delete, sender=Audience)
+def invalidate_audience(sender, instance, **kwargs):
+    cache.invalidate(cache.audience_key(instance.name, instance.audience_type))
+
+
+@receiver(pre_save, sender=Source)
+def invalidate_renamed_source(sender, instance, **kwargs):
+    if instance.pk:
+        previous = (
+            Source.objects.filter(pk=instance.pk)
+            .values_list("domain", flat=True)
+            .first()
+        )
+        if previous:
+            cache.invalidate(cache.source_key(previous))
+
+
+@receiver(post_save, sender=Source)
+@receiver(post_delete, sender=Source)
+def invalidate_source(sender, instance, **kwargs):
+    cache.invalidate(cache.source_key(instance.domain))
+
+
+@receiver(post_save, sender=Subscriber)
+def count_subscriber(sender, instance, created, **kwargs):
+    # Subscribers inserted by services.insert_subscribers() are counted there
+    if created:
+        stats.record_subscribers(Subscriber.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_delete, sender=Source)
+def detach_source_stats(sender, instance, **kwargs):
+    stats.detach_source(instance.pk)
@@ -0,0 +1,344 @@
+import logging
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from audiences.models import (
+    Audience,
+    Source,
+    Subscriber,
+    SubscriberDailyStat,
+    SubscriberStatsFlush,
+)
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+KEY = ["audience_id", "source_id", "day"]
+COUNTERS = ["subscribers", "integrations_succeeded", "integrations_failed"]
+
+# Counts waiting for flush(), as "<audience_id>:<source_id>:<day>:<counter>" fields
+DELTAS_KEY = "audiences:stats:deltas"
+# Counts taken by a flush, dropped once they're in the rollup
+FLUSHING_KEY = "audiences:stats:flushing"
+# Field of FLUSHING_KEY identifying the batch, see SubscriberStatsFlush
+FLUSH_ID_FIELD = "flush-id"
+FLUSH_LOCK_KEY = "audiences:stats:flush-lock"
+FLUSH_LOCK_TTL = 300
+
+# Days recounted per transaction by rebuild()
+REBUILD_CHUNK_DAYS = 7
+REBUILD_TABLE = "subscriber_stats_rebuild"
+
+# Groupings of the stats endpoint: values() arguments of each
+GROUP_BY = {
+    "day": (("day",), {}),
+    "audience": (("audience_id",), {"audience_name": F("audience__name")}),
+    "source": ((), {"source_domain": F("source__domain")}),
+}
+
+
+def _upsert(columns, select_sql, params):
+    """Add the counts of the rows selected by `select_sql` to the rollup."""
+    table = SubscriberDailyStat._meta.db_table
+    counters = [column for column in columns if column in COUNTERS]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) {select_sql}"
+            f" ON CONFLICT ({', '.join(KEY)}) DO UPDATE SET "
+            + ", ".join(
+                f"{counter} = {table}.{counter} + EXCLUDED.{counter}"
+                for counter in counters
+            ),
+            params,
+        )
+        return cursor.rowcount
+
+
+def _columns(rows):
+    """Return the selected columns and the SQL of a values() queryset."""
+    query = rows.query
+    sql, params = query.sql_with_params()
+    return [*query.values_select, *query.annotation_select], sql, params
+
+
+def _field(audience_id, source_id, day, counter):
+    return f"{audience_id}:{source_id or ''}:{day.isoformat()}:{counter}"
+
+
+def _parse_field(field):
+    audience_id, source_id, day, counter = field.decode().split(":")
+    return (
+        int(audience_id),
+        int(source_id) if source_id else None,
+        date.fromisoformat(day),
+        counter,
+    )
+
+
+def increment(rows):
+    """
+    Add counts to the rollup once the current transaction commits. `rows` is a
+    values() queryset grouped by audience_id, source_id and day, selecting some
+    of the COUNTERS (see subscriber_rows()). It's read right away, to see the
+    transaction's own rows, and the counts are queued in Redis for flush(), so
+    that writers never wait on the rollup rows.
+    """
+    deltas = Counter()
+    for row in rows:
+        for counter in COUNTERS:
+            if row.get(counter):
+                key = (row["audience_id"], row["source_id"], row["day"], counter)
+                deltas[key] += row[counter]
+    if deltas:
+        transaction.on_commit(partial(_queue, deltas))
+
+
+def _queue(deltas):
+    try:
+        pipe = get_redis().pipeline()
+        for key, count in deltas.items():
+            pipe.hincrby(DELTAS_KEY, _field(*key), count)
+        pipe.execute()
+    except RedisError as exc:
+        log.warning(f"Subscriber stats queue unavailable: {exc}")
+        _apply(deltas)
+
+
+def _apply(deltas):
+    """
+    Add counts ({(audience_id, source_id, day, counter): count}) to the rollup
+    in one upsert, in key order so that concurrent upserts lock rows in the
+    same order. Counts of deleted audiences are dropped, those of deleted
+    sources go to the rows without a source, like detach_source().
+    """
+    rows = defaultdict(dict)
+    for (audience_id, source_id, day, counter), count in deltas.items():
+        rows[(audience_id, source_id, day)][counter] = count
+    if not rows:
+        return 0
+
+    values = ", ".join(
+        ["(%s::bigint, %s::bigint, %s::date" + ", %s::integer" * len(COUNTERS) + ")"]
+        * len(rows)
+    )
+    params = []
+    for key, counts in rows.items():
+        params += [*key, *(counts.get(counter, 0) for counter in COUNTERS)]
+    return _upsert(
+        [*KEY, *COUNTERS],
+        f"SELECT delta.audience_id, source.id, delta.day, "
+        + ", ".join(f"SUM(delta.{counter})" for counter in COUNTERS)
+        + f" FROM (VALUES {values}) AS delta ({', '.join([*KEY, *COUNTERS])})"
+        f" JOIN {Audience._meta.db_table} audience"
+        f" ON audience.id = delta.audience_id"
+        f" LEFT JOIN {Source._meta.db_table} source ON source.id = delta.source_id"
+        f" GROUP BY 1, 2, 3 ORDER BY 1, 2, 3",
+        params,
+    )
+
+
+def _apply_batch(flush_id, deltas):
+    """
+    Add a batch of counts to the rollup unless it already was, e.g. by a flush
+    that failed to drop it from Redis, or whose lock expired. Returns the number
+    of rollup rows updated.
+    """
+    with transaction.atomic():
+        # Concurrent flushes of the batch wait here for the first one to commit
+        _, created = SubscriberStatsFlush.objects.get_or_create(flush_id=flush_id)
+        # Only the batch being flushed can come back: forget the previous ones
+        SubscriberStatsFlush.objects.exclude(flush_id=flush_id).delete()
+        if not created:
+            log.info(f"Subscriber stats batch {flush_id} was already flushed")
+            return 0
+        return _apply(deltas)
+
+
+def flush():
+    """
+    Add the counts queued by increment() to the rollup (run periodically by
+    beat). The counts are moved aside first, with an id recorded along with the
+    rollup, and only dropped once the rollup is committed: those of a failed
+    flush are added by the next one, and never twice.
+    Returns the number of rollup rows updated.
+    """
+    try:
+        client = get_redis()
+        if not client.set(FLUSH_LOCK_KEY, 1, nx=True, ex=FLUSH_LOCK_TTL):
+            return 0
+        try:
+            if not client.exists(FLUSHING_KEY):
+                if not client.exists(DELTAS_KEY):
+                    return 0
+                client.rename(DELTAS_KEY, FLUSHING_KEY)
+            # Kept if the batch already has one, i.e. a flush was interrupted
+            client.hsetnx(FLUSHING_KEY, FLUSH_ID_FIELD, str(uuid.uuid4()))
+            fields = client.hgetall(FLUSHING_KEY)
+            flush_id = uuid.UUID(fields.pop(FLUSH_ID_FIELD.encode()).decode())
+            deltas = {
+                _parse_field(field): int(count) for field, count in fields.items()
+            }
+            rows = _apply_batch(flush_id, deltas)
+            client.delete(FLUSHING_KEY)
+            return rows
+        finally:
+            client.delete(FLUSH_LOCK_KEY)
+    except RedisError as exc:
+        log.warning(f"Subscriber stats queue unavailable: {exc}")
+        return 0
+
+
+def subscriber_rows(subscribers):
+    """Count subscribers per audience, source and (local) day of creation."""
+    return (
+        subscribers.order_by()
+        .values("audience_id", "source_id", day=TruncDate("created_at"))
+        .annotate(subscribers=Count("id"))
+    )
+
+
+def record_subscribers(subscribers):
+    """Count new subscribers (a queryset) in the rollup."""
+    increment(subscriber_rows(subscribers))
+
+
+def detach_source(source_id):
+    """
+    Move the counts of a source being deleted to the rows without a source, as
+    its subscribers are.
+    """
+    table = SubscriberDailyStat._meta.db_table
+    _upsert(
+        [*KEY, *COUNTERS],
+        f"SELECT audience_id, NULL, day, {', '.join(COUNTERS)}"
+        f" FROM {table} WHERE source_id = %s ORDER BY audience_id, day",
+        [source_id],
+    )
+
+
+def day_bounds(since=None, until=None):
+    """Return the datetimes bounding the local days from `since` to `until`."""
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(since, time.min, tzinfo=tz) if since else None
+    end = (
+        datetime.combine(until + timedelta(days=1), time.min, tzinfo=tz)
+        if until
+        else None
+    )
+    return start, end
+
+
+def _rebuild_days(since, until):
+    """Swap in new counts for the days from `since` to `until`, see rebuild()."""
+    from audiences.signals import rebuilding_subscriber_stats
+
+    start, end = day_bounds(since, until)
+    sources = [
+        subscriber_rows(
+            Subscriber.objects.filter(created_at__gte=start, created_at__lt=end)
+        )
+    ]
+    sources += [
+        rows
+        for _, rows in rebuilding_subscriber_stats.send(
+            sender=SubscriberDailyStat, start=start, end=end
+        )
+    ]
+
+    table = SubscriberDailyStat._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        # The recount doesn't touch the rollup: its rows are only locked by the
+        # swap at the end of the transaction
+        cursor.execute(
+            f"CREATE TEMP TABLE {REBUILD_TABLE} (audience_id bigint,"
+            f" source_id bigint, day date, "
+            + ", ".join(f"{counter} integer DEFAULT 0" for counter in COUNTERS)
+            + ") ON COMMIT DROP"
+        )
+        for rows in sources:
+            columns, sql, params = _columns(rows)
+            cursor.execute(
+                f"INSERT INTO {REBUILD_TABLE} ({', '.join(columns)}) {sql}", params
+            )
+
+        cursor.execute(
+            f"DELETE FROM {table} WHERE day BETWEEN %s AND %s", [since, until]
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join([*KEY, *COUNTERS])})"
+            f" SELECT {', '.join(KEY)}, "
+            + ", ".join(f"SUM({counter})" for counter in COUNTERS)
+            + f" FROM {REBUILD_TABLE} GROUP BY 1, 2, 3 ORDER BY 1, 2, 3"
+        )
+        return cursor.rowcount
+
+
+def _extent():
+    """Return the first and last days with subscribers or rollup rows."""
+    subscribers = Subscriber.objects.aggregate(
+        first=Min("created_at"), last=Max("created_at")
+    )
+    stats = SubscriberDailyStat.objects.aggregate(first=Min("day"), last=Max("day"))
+    firsts = [stats["first"]]
+    lasts = [stats["last"], timezone.localdate()]
+    if subscribers["first"]:
+        firsts.append(timezone.localdate(subscribers["first"]))
+        lasts.append(timezone.localdate(subscribers["last"]))
+    return (
+        min(filter(None, firsts), default=None),
+        max(filter(None, lasts)),
+    )
+
+
+def rebuild(since=None, until=None):
+    """
+    Recount the rollup, or the days from `since` to `until`, from the
+    subscribers and the rows returned by the receivers of
+    rebuilding_subscriber_stats (e.g. integration results). Days are recounted
+    REBUILD_CHUNK_DAYS at a time, each in a short transaction that swaps the
+    new counts in, so writers and flush() never wait for the whole rebuild.
+    Queued counts are flushed before each swap; those queued while the current
+    day is swapped may still be counted twice.
+    Returns the number of rows of the rebuilt days.
+    """
+    if since is None or until is None:
+        first, last = _extent()
+        since = since or first
+        until = until or last
+    if since is None:
+        return 0
+
+    rows = 0
+    day = since
+    while day <= until:
+        last = min(day + timedelta(days=REBUILD_CHUNK_DAYS - 1), until)
+        flush()
+        rows += _rebuild_days(day, last)
+        day = last + timedelta(days=1)
+    return rows
+
+
+def summarize(stats, group_by="day"):
+    """Sum the counters of rollup rows, grouped as in GROUP_BY."""
+    fields, expressions = GROUP_BY[group_by]
+    return (
+        stats.order_by()
+        .values(*fields, **expressions)
+        .annotate(**{counter: Sum(counter) for counter in COUNTERS})
+        .order_by(*fields, *expressions)
+    )
+
+
+def totals(stats):
+    """Sum the counters of rollup rows."""
+    totals = stats.aggregate(**{counter: Sum(counter) for counter in COUNTERS})
+    return {counter: totals[counter] or 0 for counter in COUNTERS}
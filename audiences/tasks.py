@@ -0,0 +1,23 @@
+import logging
+
+from celery import shared_task
+
+from audiences import buffer, stats
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+
+@shared_task
+def drain_subscriber_buffer():
+    """Insert the submissions buffered by the write-behind ingestion mode."""
+    processed = buffer.drain()
+    if processed:
+        log.info(f"Drained {processed} buffered submissions")
+    return processed
+
+
+@shared_task
+def flush_subscriber_stats():
+    """Add the counts queued since the last flush to the daily subscriber stats."""
+    return stats.flush()
@@ -1,7 +1,26 @@
-from django.urls import path
-from audiences.views import SubscriberCreateView
+from django.urls import path, re_path
+from audiences.views import (
+    SubscriberBulkCreateView,
+    SubscriberExportView,
+    SubscriberListCreateView,
+    SubscriberStatsView,
+)
 
 urlpatterns = [
-    path("subscribers/", SubscriberCreateView.as_view(), name="subscriber-create"),
+    path("subscribers/", SubscriberListCreateView.as_view(), name="subscriber-list"),
+    path(
+        "subscribers/bulk/",
+        SubscriberBulkCreateView.as_view(),
+        name="subscriber-bulk-create",
+    ),
+    path(
+        "subscribers/stats/",
+        SubscriberStatsView.as_view(),
+        name="subscriber-stats",
+    ),
+    re_path(
+        r"^subscribers/export\.(?P<export_format>csv|ndjson)$",
+        SubscriberExportView.as_view(),
+        name="subscriber-export",
+    ),
 ]
-
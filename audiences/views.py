@@ -1,14 +1,181 @@
-from rest_framework import generics, permissions
-from audiences.models import Subscriber
-from audiences.serializers import SubscriberSerializer
+from datetime import timedelta
 
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
 
-class SubscriberCreateView(generics.CreateAPIView):
+from audiences import export, stats
+from audiences.buffer import enqueue_submission
+from audiences.filters import SubscriberDailyStatFilter, SubscriberFilter
+from audiences.models import Subscriber, SubscriberDailyStat
+from audiences.parsers import NDJSONParser
+from audiences.serializers import SubscriberListSerializer, SubscriberSerializer
+from audiences.services import (
+    bulk_create_subscribers,
+    get_or_create_source,
+    get_source_domain,
+)
+from core.pagination import KeysetPagination
+
+
+class SubscriberListCreateView(generics.ListCreateAPIView):
     """
     Public endpoint to create a new subscriber.
     Automatically records the source from the request Origin/Referer header.
+    With SUBSCRIBER_INGESTION_MODE="buffered", submissions are queued and
+    answered with 202 Accepted instead.
+
+    Listing subscribers requires authentication. The list is filtered by
+    audience id, source domain, email and created_after/created_before, and
+    paginated by keyset over the (created_at, id) index, newest first.
+    """
+
+    queryset = Subscriber.objects.select_related("audience", "source")
+    serializer_class = SubscriberSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SubscriberFilter
+    pagination_class = KeysetPagination
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.AllowAny()]
+        return [permissions.IsAuthenticated()]
+
+    def get_serializer_class(self):
+        if self.request.method == "GET":
+            return SubscriberListSerializer
+        return SubscriberSerializer
+
+    def create(self, request, *args, **kwargs):
+        if settings.SUBSCRIBER_INGESTION_MODE != "buffered":
+            return super().create(request, *args, **kwargs)
+
+        # Write-behind mode: only validate the payload here and leave the insert
+        # (and duplicate checks) to the drain task
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        submission_id = enqueue_submission(
+            serializer.validated_data, get_source_domain(request)
+        )
+        return Response(
+            {"submission_id": submission_id}, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class SubscriberBulkCreateView(generics.GenericAPIView):
+    """
+    Public endpoint to create many subscribers in one request.
+    Accepts a JSON array or an NDJSON body of submissions. Valid submissions are
+    deduplicated and inserted in one transaction; invalid and duplicate ones are
+    reported back by their position in the request body.
     """
 
     queryset = Subscriber.objects.all()
     serializer_class = SubscriberSerializer
     permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request, *args, **kwargs):
+        submissions = request.data
+        if not isinstance(submissions, list):
+            raise ValidationError("Expected a list of submissions.")
+        if len(submissions) > settings.SUBSCRIBER_BULK_MAX_ITEMS:
+            raise ValidationError(
+                f"A batch can contain at most {settings.SUBSCRIBER_BULK_MAX_ITEMS} submissions."
+            )
+
+        indexes = []
+        validated = []
+        errors = []
+        for index, submission in enumerate(submissions):
+            serializer = self.get_serializer(data=submission)
+            if serializer.is_valid():
+                indexes.append(index)
+                validated.append(serializer.validated_data)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        source = get_or_create_source(get_source_domain(request)) if validated else None
+        created, duplicates = bulk_create_subscribers(validated, source=source)
+
+        return Response(
+            {
+                "created": len(created),
+                "duplicates": [
+                    {"index": indexes[position], "detail": detail}
+                    for position, detail in duplicates
+                ],
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class SubscriberExportView(generics.GenericAPIView):
+    """
+    Authenticated endpoint streaming subscribers as CSV (custom_data flattened
+    into columns) or NDJSON, filtered by audience id, source domain and
+    created_after/created_before. Rows are read through a server-side cursor,
+    so memory stays flat however many are exported.
+    """
+
+    queryset = Subscriber.objects.all()
+
+    def perform_content_negotiation(self, request, force=False):
+        # The export isn't rendered by DRF: don't refuse "Accept: text/csv"
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, export_format, *args, **kwargs):
+        filterset = SubscriberFilter(request.query_params, queryset=self.get_queryset())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        filename = f"subscribers-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        return StreamingHttpResponse(
+            export.stream(filterset.qs, export_format),
+            content_type=export.FORMATS[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+
+class SubscriberStatsView(generics.GenericAPIView):
+    """
+    Authenticated endpoint returning subscriber and integration counts, read
+    from the daily rollup instead of counting subscribers. Filtered by
+    audience id, source domain and since/until days (the last
+    SUBSCRIBER_STATS_DEFAULT_DAYS days by default), and grouped by day,
+    audience or source.
+    """
+
+    queryset = SubscriberDailyStat.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        group_by = request.query_params.get("group_by", "day")
+        if group_by not in stats.GROUP_BY:
+            raise ValidationError(
+                {"group_by": [f"Must be one of: {', '.join(stats.GROUP_BY)}."]}
+            )
+
+        params = request.query_params.copy()
+        if not params.get("since"):
+            since = timezone.localdate() - timedelta(
+                days=settings.SUBSCRIBER_STATS_DEFAULT_DAYS - 1
+            )
+            params["since"] = since.isoformat()
+        filterset = SubscriberDailyStatFilter(params, queryset=self.get_queryset())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        return Response(
+            {
+                "since": filterset.form.cleaned_data["since"],
+                "until": filterset.form.cleaned_data["until"],
+                "totals": stats.totals(filterset.qs),
+                "results": list(stats.summarize(filterset.qs, group_by)),
+            }
+        )
@@ -0,0 +1,133 @@
+import base64
+import json
+
+from django.db import models
+from django.db.models import F, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class Row(Func):
+    """Row value, e.g. (created_at, id), compared column by column."""
+
+    function = ""
+    output_field = models.Field()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination over a unique ordering, newest first by (created_at, id) by
+    default. The `next` link carries the position of the last row of the page,
+    and the next page is read with a row comparison from there, which an index
+    on the ordering columns answers directly. Unlike page numbers or offsets,
+    deep pages cost the same as the first one. Pages only go forward.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def _fields(self, queryset):
+        return [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request, fields):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, fields):
+        values = [getattr(obj, field.attname) for field in fields]
+        cursor = json.dumps(values, default=lambda value: value.isoformat())
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        fields = self._fields(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, fields)
+        if position is not None:
+            # All the ordering columns go the same way, so rows after the
+            # position are those whose row value is past it
+            after = LessThan if self.ordering[0].startswith("-") else GreaterThan
+            queryset = queryset.filter(
+                after(
+                    Row(*(F(field.attname) for field in fields)),
+                    Row(
+                        *(
+                            Value(value, output_field=field)
+                            for field, value in zip(fields, position)
+                        )
+                    ),
+                )
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        self.next_cursor = None
+        if len(results) > self.page_size:
+            results = results[: self.page_size]
+            self.next_cursor = self.encode_cursor(results[-1], fields)
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value, from the `next` link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Number of results per page, at most {self.max_page_size}.",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -0,0 +1,16 @@
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """
+    Return a process-wide Redis client for REDIS_URL.
+    The client holds a connection pool that redis-py resets after a fork,
+    so it's safe to share across Celery prefork children.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
@@ -166,6 +166,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.sites",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # PostgreSQL index expressions (OpClass)
     # ----------------------------------- CORS ----------------------------------- #
     "corsheaders",  # Django CORS Headers
     # ----------------------------------- REST ----------------------------------- #
@@ -260,6 +261,14 @@ REDIS_DB = os.getenv("REDIS_DB")
 
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# ----------------------------------- CACHE ---------------------------------- #
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_REDIS_URL", REDIS_URL),
+    }
+}
+
 # ---------------------------------------------------------------------------- #
 #                             Internationalization                             #
 # ---------------------------------------------------------------------------- #
@@ -325,6 +334,47 @@ SPECTACULAR_SETTINGS = {
 }
 
 
+# ---------------------------------------------------------------------------- #
+#                                  SUBSCRIBERS                                 #
+# ---------------------------------------------------------------------------- #
+
+# Maximum number of submissions accepted by the bulk subscriber endpoint
+SUBSCRIBER_BULK_MAX_ITEMS = int(os.getenv("SUBSCRIBER_BULK_MAX_ITEMS", "5000"))
+
+# Subscriber exports are read from the database in chunks of this many rows
+SUBSCRIBER_EXPORT_CHUNK_SIZE = int(os.getenv("SUBSCRIBER_EXPORT_CHUNK_SIZE", "2000"))
+
+# Days covered by the subscriber stats endpoint when no "since" day is given
+SUBSCRIBER_STATS_DEFAULT_DAYS = int(os.getenv("SUBSCRIBER_STATS_DEFAULT_DAYS", "30"))
+# New counts are queued in Redis and added to the daily stats this often (seconds)
+SUBSCRIBER_STATS_FLUSH_INTERVAL = float(
+    os.getenv("SUBSCRIBER_STATS_FLUSH_INTERVAL", "10")
+)
+
+# Audience and Source lookups are cached in a per-process LRU in front of Redis.
+# Invalidations only clear the local tier of the process that saved the model,
+# so keep its TTL short.
+RESOLUTION_CACHE_TTL = int(os.getenv("RESOLUTION_CACHE_TTL", "3600"))
+RESOLUTION_CACHE_LOCAL_TTL = int(os.getenv("RESOLUTION_CACHE_LOCAL_TTL", "30"))
+RESOLUTION_CACHE_LOCAL_SIZE = int(os.getenv("RESOLUTION_CACHE_LOCAL_SIZE", "1024"))
+
+# "sync" inserts submissions during the request. "buffered" only validates them,
+# appends them to a Redis stream and answers 202 Accepted; the
+# drain_subscriber_buffer beat task then bulk-inserts them in chunks.
+SUBSCRIBER_INGESTION_MODE = os.getenv("SUBSCRIBER_INGESTION_MODE", "sync")
+SUBSCRIBER_BUFFER_STREAM = os.getenv(
+    "SUBSCRIBER_BUFFER_STREAM", "formrelay:submissions"
+)
+# Buffered submissions that can't be inserted are moved there, with the error
+SUBSCRIBER_BUFFER_DEAD_LETTER_STREAM = os.getenv(
+    "SUBSCRIBER_BUFFER_DEAD_LETTER_STREAM", "formrelay:submissions:dead"
+)
+SUBSCRIBER_BUFFER_DRAIN_CHUNK = int(os.getenv("SUBSCRIBER_BUFFER_DRAIN_CHUNK", "500"))
+SUBSCRIBER_BUFFER_DRAIN_INTERVAL = float(
+    os.getenv("SUBSCRIBER_BUFFER_DRAIN_INTERVAL", "2")
+)
+
+
 # ---------------------------------------------------------------------------- #
 #                                AUTHENTICATION                                #
 # ---------------------------------------------------------------------------- #
@@ -367,6 +417,124 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_TASK_ALWAYS_EAGER = DEBUG
 CELERY_TASK_EAGER_PROPAGATES = DEBUG  # Propagate exceptions in eager mode
 
+# Integrations of subscribers created in the same transaction are sent as one
+# task message of at most INTEGRATION_DISPATCH_BATCH_SIZE ids. A window (in
+# seconds) also coalesces subscribers created across requests.
+INTEGRATION_DISPATCH_WINDOW = float(os.getenv("INTEGRATION_DISPATCH_WINDOW", "0"))
+INTEGRATION_DISPATCH_BATCH_SIZE = int(
+    os.getenv("INTEGRATION_DISPATCH_BATCH_SIZE", "500")
+)
+
+# Each (subscriber, integration) runs as its own task. Providers can be routed
+# to dedicated queues, e.g. "smtp=smtp,mailchimp=http"; workers then need to
+# consume them with `celery -A core worker -Q celery,smtp,http`.
+INTEGRATION_TASK_QUEUES = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("INTEGRATION_TASK_QUEUES", "").split(",")
+    if "=" in item
+)
+
+# HTTP-based providers reuse keep-alive connections from a per-process pool
+# keyed by host and credentials. Sessions idle for longer than the keep-alive
+# (in seconds) are recycled.
+INTEGRATION_HTTP_POOL_SIZE = int(os.getenv("INTEGRATION_HTTP_POOL_SIZE", "10"))
+INTEGRATION_HTTP_KEEPALIVE = float(os.getenv("INTEGRATION_HTTP_KEEPALIVE", "60"))
+INTEGRATION_HTTP_TIMEOUT = float(os.getenv("INTEGRATION_HTTP_TIMEOUT", "10"))
+
+# SMTP connections stay open between notifications. At most SMTP_POOL_SIZE idle
+# connections are kept per server and account; they are closed after
+# SMTP_POOL_IDLE_TIMEOUT seconds without use.
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_IDLE_TIMEOUT = float(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "30"))
+
+# "tasks" runs each (subscriber, integration) pair as its own task. "async"
+# runs the pairs of a dispatch concurrently on one event loop in a single task,
+# INTEGRATION_ASYNC_CONCURRENCY provider calls at a time; providers without
+# native async support are run in threads. Batch-capable providers keep their
+# batch task either way.
+INTEGRATION_EXECUTION_MODE = os.getenv("INTEGRATION_EXECUTION_MODE", "tasks")
+INTEGRATION_ASYNC_CONCURRENCY = int(os.getenv("INTEGRATION_ASYNC_CONCURRENCY", "100"))
+
+# Integrations whose config sets a "batch_window" (in seconds) collect their
+# subscribers in Redis and run them in batches of at most
+# INTEGRATION_BATCH_MAX_SIZE, when the window ends or the batch is full.
+INTEGRATION_BATCH_MAX_SIZE = int(os.getenv("INTEGRATION_BATCH_MAX_SIZE", "500"))
+
+# Notification integrations (ntfy, SMTP) whose audience settings set a
+# "digest_window" (in seconds) send one summary for the subscribers of the
+# window, of at most INTEGRATION_DIGEST_MAX_SIZE subscribers unless the
+# "digest_size" setting says otherwise. Due digests are sent by beat.
+INTEGRATION_DIGEST_MAX_SIZE = int(os.getenv("INTEGRATION_DIGEST_MAX_SIZE", "100"))
+INTEGRATION_DIGEST_FLUSH_INTERVAL = float(
+    os.getenv("INTEGRATION_DIGEST_FLUSH_INTERVAL", "30")
+)
+
+# Integrations whose config sets a "rate_limit" (e.g. "10/s", "600/m") share a
+# Redis token bucket across workers. Tasks that run out of tokens are deferred
+# until the next token is due; the async engine waits for tokens itself, for up
+# to INTEGRATION_RATE_LIMIT_MAX_WAIT seconds.
+INTEGRATION_RATE_LIMIT_MAX_WAIT = float(
+    os.getenv("INTEGRATION_RATE_LIMIT_MAX_WAIT", "5")
+)
+
+# Transient integration errors (timeouts, connection errors, HTTP 429/5xx,
+# temporary SMTP failures) are retried with exponential backoff and jitter, from
+# INTEGRATION_RETRY_BACKOFF up to INTEGRATION_RETRY_BACKOFF_MAX seconds.
+INTEGRATION_MAX_RETRIES = int(os.getenv("INTEGRATION_MAX_RETRIES", "5"))
+INTEGRATION_RETRY_BACKOFF = float(os.getenv("INTEGRATION_RETRY_BACKOFF", "10"))
+INTEGRATION_RETRY_BACKOFF_MAX = float(os.getenv("INTEGRATION_RETRY_BACKOFF_MAX", "600"))
+
+# INTEGRATION_CIRCUIT_THRESHOLD transient failures of an integration within
+# INTEGRATION_CIRCUIT_WINDOW seconds open its circuit: its tasks are deferred
+# without calling the provider for INTEGRATION_CIRCUIT_COOLDOWN seconds.
+INTEGRATION_CIRCUIT_THRESHOLD = int(os.getenv("INTEGRATION_CIRCUIT_THRESHOLD", "5"))
+INTEGRATION_CIRCUIT_WINDOW = int(os.getenv("INTEGRATION_CIRCUIT_WINDOW", "60"))
+INTEGRATION_CIRCUIT_COOLDOWN = int(os.getenv("INTEGRATION_CIRCUIT_COOLDOWN", "60"))
+
+# Replays (replay_integrations command, admin actions) re-run integrations for
+# existing subscribers on their own queue, consumed by a dedicated worker
+# (`celery -A core worker -Q replay`), so they never delay live submissions.
+# Chunks of INTEGRATION_REPLAY_CHUNK_SIZE subscribers are queued, at most
+# INTEGRATION_REPLAY_CONCURRENCY at a time and INTEGRATION_REPLAY_RATE
+# subscribers per second (0 for no limit).
+INTEGRATION_REPLAY_QUEUE = os.getenv("INTEGRATION_REPLAY_QUEUE", "replay")
+INTEGRATION_REPLAY_CHUNK_SIZE = int(os.getenv("INTEGRATION_REPLAY_CHUNK_SIZE", "100"))
+INTEGRATION_REPLAY_CONCURRENCY = int(os.getenv("INTEGRATION_REPLAY_CONCURRENCY", "2"))
+INTEGRATION_REPLAY_RATE = float(os.getenv("INTEGRATION_REPLAY_RATE", "50"))
+
+# On PostgreSQL integration logs are partitioned by month. Beat creates the
+# partitions of the next INTEGRATION_LOG_PARTITIONS_AHEAD months and drops the
+# months older than INTEGRATION_LOG_RETENTION_DAYS (0 keeps logs forever).
+INTEGRATION_LOG_PARTITIONS_AHEAD = int(
+    os.getenv("INTEGRATION_LOG_PARTITIONS_AHEAD", "3")
+)
+INTEGRATION_LOG_RETENTION_DAYS = int(os.getenv("INTEGRATION_LOG_RETENTION_DAYS", "0"))
+INTEGRATION_LOG_MAINTENANCE_INTERVAL = float(
+    os.getenv("INTEGRATION_LOG_MAINTENANCE_INTERVAL", "3600")
+)
+
+# Periodic tasks, run by the beat service (see docker/entrypoint-beat.sh)
+CELERY_BEAT_SCHEDULE = {
+    "flush-integration-digests": {
+        "task": "integrations.tasks.flush_integration_digests",
+        "schedule": INTEGRATION_DIGEST_FLUSH_INTERVAL,
+    },
+    "maintain-integration-logs": {
+        "task": "integrations.tasks.maintain_integration_logs",
+        "schedule": INTEGRATION_LOG_MAINTENANCE_INTERVAL,
+    },
+    "flush-subscriber-stats": {
+        "task": "audiences.tasks.flush_subscriber_stats",
+        "schedule": SUBSCRIBER_STATS_FLUSH_INTERVAL,
+    },
+}
+
+if SUBSCRIBER_INGESTION_MODE == "buffered":
+    CELERY_BEAT_SCHEDULE["drain-subscriber-buffer"] = {
+        "task": "audiences.tasks.drain_subscriber_buffer",
+        "schedule": SUBSCRIBER_BUFFER_DRAIN_INTERVAL,
+    }
+
 
 # ---------------------------------------------------------------------------- #
 #                                 HEALTH CHECK                                 #
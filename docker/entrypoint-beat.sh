@@ -0,0 +1,10 @@
+#!/bin/sh
+
+until cd /app/backend
+do
+    echo "Waiting for server volume..."
+done
+
+# run the periodic task scheduler (only one beat instance should run)
+echo "Starting celery beat..."
+celery -A core beat -l info
@@ -7,4 +7,4 @@ done
 
 # run a worker
 echo "Starting celery worker..."
-celery -A core worker -l info --concurrency 1 -E
\ No newline at end of file
+celery -A core worker -l info --concurrency "${CELERY_CONCURRENCY:-1}" -Q "${CELERY_QUEUES:-celery}" -E
\ No newline at end of file
@@ -1,12 +1,21 @@
 import json
+from datetime import datetime
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
 from django.http import JsonResponse
 from django.urls import path
 
+from audiences.models import Subscriber
+from core.paginator import EstimatedCountPaginator
+from integrations import replay
 from integrations.models import Integration, AudienceIntegration, IntegrationLog
 from integrations.registry import IntegrationRegistry
 
+# Query string parameter of the keyset-paged IntegrationLog changelist
+CURSOR_VAR = "before"
+
 
 @admin.register(Integration)
 class IntegrationAdmin(admin.ModelAdmin):
@@ -54,11 +63,130 @@ class AudienceIntegrationAdmin(admin.ModelAdmin):
     list_filter = ["is_active", "integration__integration_type"]
     search_fields = ["audience__name", "integration__name"]
     readonly_fields = ["created_at", "updated_at"]
+    actions = ["replay_all", "replay_failed"]
+
+    def _start_replay(self, request, queryset, log_status=None):
+        audience_integration_ids = list(
+            queryset.filter(is_active=True).values_list("id", flat=True)
+        )
+        if not audience_integration_ids:
+            self.message_user(
+                request, "No active audience integration selected.", messages.WARNING
+            )
+            return
+        state = replay.get(
+            replay.start(audience_integration_ids, log_status=log_status)
+        )
+        self.message_user(
+            request,
+            f"Started replay {replay.describe(state)}. Follow it with "
+            f"`manage.py replay_integrations --progress {state['id']}`.",
+        )
+
+    @admin.action(description="Replay for all existing subscribers")
+    def replay_all(self, request, queryset):
+        self._start_replay(request, queryset)
+
+    @admin.action(description="Retry failed integrations")
+    def replay_failed(self, request, queryset):
+        self._start_replay(request, queryset, log_status="failed")
+
+
+class IntegrationTypeFilter(admin.SimpleListFilter):
+    """
+    Filter logs by provider type through the ids of its integrations, so that
+    the (integration, status, created_at) index is used instead of a join.
+    """
+
+    title = "integration type"
+    parameter_name = "integration_type"
+
+    def lookups(self, request, model_admin):
+        return IntegrationRegistry.choices()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            integration_ids = Integration.objects.filter(
+                integration_type=self.value()
+            ).values_list("id", flat=True)
+            return queryset.filter(integration_id__in=list(integration_ids))
+        return queryset
+
+
+class IntegrationLogChangeList(ChangeList):
+    """
+    Changelist paged by keyset when sorted newest first (the default): the next
+    page holds the logs older than the last one shown, found through the
+    created_at indexes instead of an OFFSET that reads every previous row.
+    Sorting by a column falls back to numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset_paging(self):
+        return ORDER_VAR not in self.params
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        if not self.cursor or not self.keyset_paging:
+            return queryset
+        try:
+            created_at, pk = self.cursor.rsplit("_", 1)
+            created_at, pk = datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise IncorrectLookupParameters(f"Invalid cursor: {self.cursor}")
+        return queryset.filter(created_at__lte=created_at).exclude(
+            created_at=created_at, pk__gte=pk
+        )
+
+    def newest_page_url(self):
+        if self.cursor:
+            return self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR])
+        return None
+
+    def older_page_url(self):
+        if not self.multi_page or self.show_all:
+            return None
+        results = list(self.result_list)
+        if len(results) < self.list_per_page:
+            return None
+        last = results[-1]
+        cursor = f"{last.created_at.isoformat()}_{last.pk}"
+        return self.get_query_string({CURSOR_VAR: cursor}, remove=[PAGE_VAR])
 
 
 @admin.register(IntegrationLog)
 class IntegrationLogAdmin(admin.ModelAdmin):
     list_display = ["subscriber", "integration", "status", "created_at"]
-    list_filter = ["status", "integration__integration_type"]
-    search_fields = ["subscriber__email", "integration__name"]
+    list_filter = ["status", "integration", IntegrationTypeFilter]
+    list_select_related = ["subscriber__audience", "integration"]
+    search_fields = ["subscriber__email"]
+    search_help_text = "Email address, or its beginning"
     readonly_fields = ["created_at"]
+    raw_id_fields = ["subscriber"]
+    ordering = ["-created_at", "-id"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return IntegrationLogChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match the beginning of the subscriber email, case-insensitively, so a
+        full address finds its logs too. Uses the Subscriber email index,
+        unlike the default icontains over a join.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        subscribers = Subscriber.objects.filter(email__istartswith=search_term)
+        return queryset.filter(subscriber__in=subscribers.values("id")), False
@@ -1,11 +1,38 @@
+import asyncio
 from abc import ABC, abstractmethod
 
+from django.conf import settings
+
+from integrations import engine, http
+
 
 class BaseIntegration(ABC):
     """Base class for all integrations"""
 
+    # Whether execute_many() uses a native bulk API. Such providers handle all
+    # the subscribers of a dispatch in one task even without a batch window.
+    supports_batch = False
+
+    # Whether repeating a call for a subscriber is harmless (e.g. an upsert).
+    # Other providers get a pending IntegrationLog before the call, so that a
+    # worker dying mid-call leaves a trace that it may have gone through.
+    idempotent = False
+
+    # Whether the provider implements execute_digest() to notify about several
+    # subscribers at once, enabled by a "digest_window" audience setting
+    supports_digest = False
+
+    # Config keys understood by every provider, added to each config_schema()
+    common_config_schema = {
+        "batch_window": 0,  # seconds to collect subscribers into batches, 0 to disable
+        "rate_limit": "",  # e.g. "10/s" or "600/m", empty for no limit
+    }
+
     def __init__(self, config):
         self.config = config
+        # ratelimit.TokenBucket of the Integration, paces execute_many() and the
+        # async engine when set
+        self.rate_limiter = None
 
     @classmethod
     def config_schema(cls):
@@ -15,11 +42,37 @@ class BaseIntegration(ABC):
         """
         return {}
 
+    @classmethod
+    def get_config_schema(cls):
+        """Return config_schema() with the keys common to all providers."""
+        return {**cls.config_schema(), **cls.common_config_schema}
+
     @abstractmethod
     def execute(self, subscriber, audience_settings=None):
         """Execute the integration for a subscriber"""
         pass
 
+    def execute_many(self, subscribers, audience_settings=None):
+        """
+        Execute the integration for several subscribers. Returns one result or
+        exception per subscriber, in order. Providers without a bulk API run
+        aexecute() concurrently for each of them.
+        """
+        return engine.execute_concurrently(
+            [(self, subscriber, audience_settings) for subscriber in subscribers]
+        )
+
+    def execute_digest(self, subscribers, audience_settings=None):
+        """Send one summary notification for several subscribers"""
+        raise NotImplementedError(f"{self.get_name()} doesn't support digests")
+
+    async def aexecute(self, subscriber, audience_settings=None):
+        """
+        Execute the integration for a subscriber on an event loop. Providers that
+        don't override this with native async I/O run execute() in a thread.
+        """
+        return await asyncio.to_thread(self.execute, subscriber, audience_settings)
+
     @abstractmethod
     def validate_config(self):
         """Validate the integration configuration"""
@@ -27,3 +80,26 @@ class BaseIntegration(ABC):
 
     def get_name(self):
         return self.__class__.__name__
+
+    def get_session(self, url):
+        """Return the pooled keep-alive HTTP session for `url`'s host and this config."""
+        return http.get_session(url, self.config)
+
+    def http_post(self, url, **kwargs):
+        """POST through the pooled session, reusing warm connections between calls."""
+        kwargs.setdefault("timeout", settings.INTEGRATION_HTTP_TIMEOUT)
+        return self.get_session(url).post(url, **kwargs)
+
+    def http_get(self, url, **kwargs):
+        """GET through the pooled session, like http_post()."""
+        kwargs.setdefault("timeout", settings.INTEGRATION_HTTP_TIMEOUT)
+        return self.get_session(url).get(url, **kwargs)
+
+    async def ahttp_post(self, url, **kwargs):
+        """Async counterpart of http_post(), through the event loop's pooled httpx client."""
+        # httpx takes raw bodies as content=, requests as data=
+        if isinstance(kwargs.get("data"), (bytes, str)):
+            kwargs["content"] = kwargs.pop("data")
+        async with http.async_clients():
+            client = http.get_async_client(url, self.config)
+            return await client.post(url, **kwargs)
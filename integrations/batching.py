@@ -0,0 +1,86 @@
+import logging
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+
+def _pending_key(integration_id):
+    return f"integrations:batch:{integration_id}:pending"
+
+
+def _scheduled_key(integration_id):
+    return f"integrations:batch:{integration_id}:scheduled"
+
+
+def get_window(audience_integration):
+    """Seconds during which the integration's subscribers are collected, 0 if it doesn't batch."""
+    return float(audience_integration.integration.config.get("batch_window") or 0)
+
+
+def collect(audience_integration, subscriber_ids, options):
+    """
+    Add subscribers to the pending batch of the audience integration's
+    Integration, shared by all the audiences linked to it. The batch is flushed
+    once INTEGRATION_BATCH_MAX_SIZE subscribers are pending, or when its window
+    ends. Without Redis, the subscribers are sent as a batch right away.
+    """
+    from integrations.tasks import (
+        flush_integration_batch,
+        run_audience_integration_batch,
+    )
+
+    integration_id = audience_integration.integration_id
+    window = get_window(audience_integration)
+    try:
+        client = get_redis()
+        pending = client.rpush(
+            _pending_key(integration_id),
+            *(
+                f"{audience_integration.id}:{subscriber_id}"
+                for subscriber_id in subscriber_ids
+            ),
+        )
+        if pending >= settings.INTEGRATION_BATCH_MAX_SIZE:
+            flush_integration_batch.apply_async((integration_id,), **options)
+        elif client.set(
+            _scheduled_key(integration_id), 1, nx=True, ex=math.ceil(window) * 2 + 60
+        ):
+            # The first subscribers of a window schedule its flush
+            flush_integration_batch.apply_async(
+                (integration_id,), countdown=window, **options
+            )
+    except RedisError as exc:
+        log.warning(f"Integration batching unavailable: {exc}")
+        run_audience_integration_batch.apply_async(
+            (subscriber_ids, audience_integration.id), **options
+        )
+
+
+def flush(integration_id):
+    """
+    Pop the pending subscribers of an Integration, INTEGRATION_BATCH_MAX_SIZE at
+    a time. Yields them as {audience_integration_id: [subscriber_id, ...]}.
+    """
+    client = get_redis()
+
+    # Let the next subscribers schedule a new window before draining this one
+    client.delete(_scheduled_key(integration_id))
+    while True:
+        entries = client.lpop(
+            _pending_key(integration_id), settings.INTEGRATION_BATCH_MAX_SIZE
+        )
+        if not entries:
+            break
+
+        batches = defaultdict(list)
+        for entry in entries:
+            audience_integration_id, subscriber_id = entry.decode().split(":")
+            batches[int(audience_integration_id)].append(int(subscriber_id))
+        yield batches
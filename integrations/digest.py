@@ -0,0 +1,108 @@
+import logging
+import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+# Sorted set of the audience integrations with pending subscribers, scored by
+# the time their digest is due
+DUE_KEY = "integrations:digest:due"
+
+# Pop a digest's subscribers, then either forget the digest or, if more are
+# pending, make the remainder due one window later. Atomic so that subscribers
+# collected meanwhile can't be left without a due time.
+POP_SCRIPT = """
+local ids = redis.call('LPOP', KEYS[1], ARGV[1])
+if redis.call('LLEN', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+else
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[2])
+end
+return ids
+"""
+
+
+def _pending_key(audience_integration_id):
+    return f"integrations:digest:{audience_integration_id}:pending"
+
+
+def get_window(audience_integration):
+    """
+    Seconds during which new subscribers are aggregated into one notification,
+    from the audience integration's "digest_window" setting; 0 disables digests.
+    """
+    return float((audience_integration.settings or {}).get("digest_window") or 0)
+
+
+def get_size(audience_integration):
+    """Maximum number of subscribers in one digest, from the "digest_size" setting."""
+    return int(
+        (audience_integration.settings or {}).get("digest_size")
+        or settings.INTEGRATION_DIGEST_MAX_SIZE
+    )
+
+
+def collect(audience_integration, subscriber_ids, options):
+    """
+    Add subscribers to the pending digest of an audience integration. The digest
+    is sent when it's full, or by flush_integration_digests once its window ends.
+    Without Redis, a digest of these subscribers is sent right away.
+    """
+    from integrations.tasks import send_integration_digest
+
+    try:
+        pipe = get_redis().pipeline()
+        pipe.rpush(_pending_key(audience_integration.id), *subscriber_ids)
+        # The first subscribers of a digest set when it's due
+        pipe.zadd(
+            DUE_KEY,
+            {audience_integration.id: time.time() + get_window(audience_integration)},
+            nx=True,
+        )
+        pending, _ = pipe.execute()
+    except RedisError as exc:
+        log.warning(f"Integration digests unavailable: {exc}")
+        send_integration_digest.apply_async(
+            (audience_integration.id, subscriber_ids), **options
+        )
+        return
+
+    if pending >= get_size(audience_integration):
+        send_integration_digest.apply_async((audience_integration.id,), **options)
+
+
+def pop(audience_integration):
+    """Pop the subscriber ids of an audience integration's next digest."""
+    ids = get_redis().eval(
+        POP_SCRIPT,
+        2,
+        _pending_key(audience_integration.id),
+        DUE_KEY,
+        get_size(audience_integration),
+        audience_integration.id,
+        time.time() + get_window(audience_integration),
+    )
+    return [int(subscriber_id) for subscriber_id in ids or []]
+
+
+def discard(audience_integration_id):
+    """Drop the pending digest of an audience integration that no longer exists."""
+    pipe = get_redis().pipeline()
+    pipe.delete(_pending_key(audience_integration_id))
+    pipe.zrem(DUE_KEY, audience_integration_id)
+    pipe.execute()
+
+
+def due():
+    """Return the ids of the audience integrations whose digest is due."""
+    return [
+        int(audience_integration_id)
+        for audience_integration_id in get_redis().zrangebyscore(
+            DUE_KEY, "-inf", time.time()
+        )
+    ]
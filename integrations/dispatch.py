@@ -0,0 +1,77 @@
+import math
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from core.redis_client import get_redis
+
+# Subscriber ids waiting for the current transaction to commit, per thread
+_local = threading.local()
+
+PENDING_KEY = "integrations:dispatch:pending"
+SCHEDULED_KEY = "integrations:dispatch:scheduled"
+
+
+def dispatch_subscriber_integrations(subscriber_ids):
+    """
+    Queue the integrations of new subscribers once the current transaction commits.
+
+    Ids added within the same transaction are coalesced into a single task
+    message. With INTEGRATION_DISPATCH_WINDOW set, committed ids are further
+    collected in Redis and dispatched together once per window.
+    """
+    if not hasattr(_local, "pending"):
+        _local.pending = []
+    _local.pending.extend(subscriber_ids)
+
+    # Every call registers a flush so that the ids survive a rolled back
+    # savepoint; the first flush to run sends them all, the others are no-ops.
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    subscriber_ids, _local.pending = _local.pending, []
+    if not subscriber_ids:
+        return
+
+    window = settings.INTEGRATION_DISPATCH_WINDOW
+    if window <= 0:
+        send(subscriber_ids)
+        return
+
+    client = get_redis()
+    client.rpush(PENDING_KEY, *subscriber_ids)
+
+    # The first ids of a window schedule its flush. The key outlives the window
+    # so a lost flush task can't strand ids for more than one extra window.
+    if client.set(SCHEDULED_KEY, 1, nx=True, ex=math.ceil(window) * 2 + 60):
+        from integrations.tasks import flush_integration_dispatch
+
+        flush_integration_dispatch.apply_async(countdown=window)
+
+
+def send(subscriber_ids):
+    """Send the integrations task for the given subscribers in bounded chunks."""
+    from integrations.tasks import process_subscribers_integrations
+
+    batch_size = settings.INTEGRATION_DISPATCH_BATCH_SIZE
+    for start in range(0, len(subscriber_ids), batch_size):
+        process_subscribers_integrations.delay(
+            subscriber_ids[start : start + batch_size]
+        )
+
+
+def flush_window():
+    """Dispatch every id collected in Redis during the current window."""
+    client = get_redis()
+
+    # Let the next ids schedule a new window before draining this one, so none
+    # are left behind; at worst the next flush finds the list empty.
+    client.delete(SCHEDULED_KEY)
+    batch_size = settings.INTEGRATION_DISPATCH_BATCH_SIZE
+    while True:
+        subscriber_ids = client.lpop(PENDING_KEY, batch_size)
+        if not subscriber_ids:
+            break
+        send([int(subscriber_id) for subscriber_id in subscriber_ids])
@@ -0,0 +1,36 @@
+import asyncio
+
+from django.conf import settings
+
+from integrations import http
+
+
+async def _gather(calls):
+    semaphore = asyncio.Semaphore(settings.INTEGRATION_ASYNC_CONCURRENCY)
+
+    async def run(integration, subscriber, audience_settings):
+        if integration.rate_limiter:
+            await integration.rate_limiter.acquire_async()
+        async with semaphore:
+            return await integration.aexecute(subscriber, audience_settings)
+
+    async with http.async_clients():
+        return await asyncio.gather(
+            *(run(*call) for call in calls), return_exceptions=True
+        )
+
+
+def execute_concurrently(calls):
+    """
+    Run (integration, subscriber, audience_settings) calls concurrently on one
+    event loop, at most INTEGRATION_ASYNC_CONCURRENCY at a time, through
+    BaseIntegration.aexecute(). Calls to rate-limited integrations wait for
+    their tokens; ratelimit.RateLimited is returned for those that would wait too
+    long. Returns one result or exception per call, in order.
+
+    Subscribers must have their audience and source loaded: providers can't
+    query the database from the event loop.
+    """
+    if not calls:
+        return []
+    return asyncio.run(_gather(calls))
@@ -0,0 +1,112 @@
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Pooled sessions of this worker process, keyed by (host, credentials digest)
+_sessions = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+# Async clients of the running event loop, keyed like the sessions. They are
+# bound to the loop, so they only live for one async_clients() block.
+_async_clients = contextvars.ContextVar("integrations_async_clients", default=None)
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.INTEGRATION_HTTP_POOL_SIZE,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _key(url, credentials):
+    digest = hashlib.sha256(
+        json.dumps(credentials, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return (urlparse(url).netloc, digest)
+
+
+def get_session(url, credentials):
+    """
+    Return the keep-alive session shared by every call to the host of `url` made
+    with the same credentials (typically the integration config) in this process.
+    Sessions idle for longer than INTEGRATION_HTTP_KEEPALIVE are replaced, so
+    that connections the server has likely closed aren't reused.
+    """
+    global _pid
+
+    key = _key(url, credentials)
+    now = time.monotonic()
+
+    with _lock:
+        # Connections can't be shared with the parent after a (prefork) fork
+        if os.getpid() != _pid:
+            _sessions.clear()
+            _pid = os.getpid()
+
+        entry = _sessions.get(key)
+        if entry and now - entry[1] > settings.INTEGRATION_HTTP_KEEPALIVE:
+            entry[0].close()
+            entry = None
+
+        session = entry[0] if entry else _new_session()
+        _sessions[key] = (session, now)
+        return session
+
+
+@asynccontextmanager
+async def async_clients():
+    """
+    Pool httpx.AsyncClient instances for the duration of the block, so that the
+    coroutines of one event loop run share keep-alive connections. They are
+    closed when the outermost block exits; nested blocks reuse its pool.
+    """
+    if _async_clients.get() is not None:
+        yield
+        return
+
+    clients = {}
+    token = _async_clients.set(clients)
+    try:
+        yield
+    finally:
+        _async_clients.reset(token)
+        for client in clients.values():
+            await client.aclose()
+
+
+def get_async_client(url, credentials):
+    """
+    Return the async client for the host of `url` and these credentials from
+    the pool of the current async_clients() block.
+    """
+    clients = _async_clients.get()
+    if clients is None:
+        raise RuntimeError("get_async_client() must be called within async_clients()")
+
+    key = _key(url, credentials)
+    if key not in clients:
+        clients[key] = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.INTEGRATION_HTTP_POOL_SIZE,
+                keepalive_expiry=settings.INTEGRATION_HTTP_KEEPALIVE,
+            ),
+            timeout=settings.INTEGRATION_HTTP_TIMEOUT,
+            # Like requests
+            follow_redirects=True,
+        )
+    return clients[key]
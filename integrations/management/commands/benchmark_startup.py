@@ -0,0 +1,80 @@
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Setting up Django must not import these: providers are loaded on first use
+LAZY_MODULES = ("integrations.providers.",)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the time it takes a fresh process to set up Django, list the "
+        "slowest imports, and check that no provider is imported at startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--runs", type=int, default=5, help="Processes to time (default: 5)"
+        )
+        parser.add_argument(
+            "--top", type=int, default=15, help="Slowest imports to list (default: 15)"
+        )
+        parser.add_argument(
+            "--max-ms",
+            type=float,
+            help="Fail if the median setup time exceeds this many milliseconds",
+        )
+
+    def _run(self):
+        """
+        Set up Django in a new process. Returns its wall time, the times of the
+        top-level imports and the names of all the modules imported.
+        """
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import django; django.setup()"],
+            capture_output=True,
+            text=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode:
+            raise CommandError(f"Django setup failed:\n{result.stderr}")
+
+        # Lines look like "import time:  self [us] | cumulative | imported package"
+        imports = {}
+        modules = set()
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            modules.add(name.strip())
+            if not name.startswith("  "):
+                # Top-level import: its cumulative time includes its children
+                imports[name.strip()] = int(cumulative) / 1000
+        return elapsed, imports, modules
+
+    def handle(self, *args, **options):
+        runs = [self._run() for _ in range(options["runs"])]
+        elapsed = statistics.median(run[0] for run in runs)
+        _, imports, modules = runs[-1]
+
+        self.stdout.write(
+            f"Django setup: {elapsed:.0f} ms (median of {len(runs)} runs)"
+        )
+        self.stdout.write(f"Imports: {sum(imports.values()):.0f} ms")
+        for name, ms in sorted(imports.items(), key=lambda item: -item[1])[
+            : options["top"]
+        ]:
+            self.stdout.write(f"  {ms:8.1f} ms  {name}")
+
+        eager = sorted(name for name in modules if name.startswith(LAZY_MODULES))
+        if eager:
+            raise CommandError(f"Imported at startup: {', '.join(eager)}")
+        if options["max_ms"] and elapsed > options["max_ms"]:
+            raise CommandError(
+                f"Django setup took {elapsed:.0f} ms, over the {options['max_ms']:.0f} ms limit"
+            )
+        self.stdout.write(self.style.SUCCESS("No provider is imported at startup"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from integrations import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the upcoming monthly IntegrationLog partitions and drop the "
+        "partitions older than the retention. Run periodically by beat too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            help="Months to create partitions for (default: INTEGRATION_LOG_PARTITIONS_AHEAD)",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            help="Days of logs to keep, 0 for all (default: INTEGRATION_LOG_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show what would be created and dropped",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+
+        if not partitions.is_partitioned():
+            self.stdout.write(
+                "The integration log table isn't partitioned, deleting expired logs"
+            )
+            deleted = partitions.delete_expired(options["retention_days"], dry_run)
+            verb = "Would delete" if dry_run else "Deleted"
+            self.stdout.write(f"{verb} {deleted} logs")
+            return
+
+        verb = "Would create" if dry_run else "Created"
+        for name in partitions.ensure_partitions(options["ahead"], dry_run):
+            self.stdout.write(f"{verb} partition {name}")
+        verb = "Would drop" if dry_run else "Dropped"
+        for name in partitions.drop_expired(options["retention_days"], dry_run):
+            self.stdout.write(f"{verb} partition {name}")
+        self.stdout.write(
+            self.style.SUCCESS("Integration log partitions are up to date")
+        )
@@ -0,0 +1,127 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from integrations import replay
+from integrations.models import AudienceIntegration, IntegrationLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run the integrations of existing subscribers, e.g. after adding an "
+        "audience integration or a provider outage. The subscribers are queued in "
+        "chunks on the replay queue, with a concurrency and rate ceiling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--audience", type=int, help="Audience id")
+        parser.add_argument(
+            "--integration", type=int, help="Only replay this Integration id"
+        )
+        parser.add_argument("--source", help="Source domain")
+        parser.add_argument(
+            "--created-after",
+            help="Only subscribers created at or after this ISO date/time",
+        )
+        parser.add_argument(
+            "--created-before",
+            help="Only subscribers created before this ISO date/time",
+        )
+        parser.add_argument(
+            "--status",
+            choices=[status for status, _ in IntegrationLog.STATUS_CHOICES],
+            help=(
+                "Only replay integrations that logged this status for the "
+                "subscriber, e.g. failed (and haven't succeeded since)"
+            ),
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, help="Subscribers per task (default: setting)"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Chunks in flight at once (default: setting)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            help="Subscribers per second, 0 for no limit (default: setting)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the subscribers that would be replayed",
+        )
+        parser.add_argument(
+            "--wait", action="store_true", help="Report progress until it's done"
+        )
+        parser.add_argument("--progress", metavar="ID", help="Show a replay's progress")
+        parser.add_argument("--cancel", metavar="ID", help="Cancel a replay")
+        parser.add_argument("--list", action="store_true", help="List the replays")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for state in replay.list_replays():
+                self.stdout.write(replay.describe(state))
+            return
+        if options["cancel"]:
+            if not replay.cancel(options["cancel"]):
+                raise CommandError(f"Unknown replay {options['cancel']}")
+            self.stdout.write(f"Cancelled replay {options['cancel']}")
+            return
+        if options["progress"]:
+            self._report(options["progress"], options["wait"])
+            return
+
+        audience_integrations = AudienceIntegration.objects.filter(is_active=True)
+        if options["audience"]:
+            audience_integrations = audience_integrations.filter(
+                audience_id=options["audience"]
+            )
+        if options["integration"]:
+            audience_integrations = audience_integrations.filter(
+                integration_id=options["integration"]
+            )
+        audience_integration_ids = list(
+            audience_integrations.values_list("id", flat=True)
+        )
+        if not audience_integration_ids:
+            raise CommandError("No active audience integration matches")
+
+        filters = {
+            name: options[name]
+            for name in ["source", "created_after", "created_before"]
+            if options[name]
+        }
+        try:
+            if options["dry_run"]:
+                count = replay.select_subscribers(
+                    audience_integration_ids, filters, options["status"]
+                ).count()
+                self.stdout.write(f"{count} subscribers would be replayed")
+                return
+
+            replay_id = replay.start(
+                audience_integration_ids,
+                filters,
+                options["status"],
+                chunk_size=options["chunk_size"],
+                concurrency=options["concurrency"],
+                rate=options["rate"],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(f"Started replay {replay_id}")
+        self._report(replay_id, options["wait"])
+
+    def _report(self, replay_id, wait):
+        while True:
+            state = replay.get(replay_id)
+            if state is None:
+                raise CommandError(f"Unknown replay {replay_id}")
+            self.stdout.write(replay.describe(state))
+            if not wait or state["status"] != "running":
+                return
+            time.sleep(replay.POLL_INTERVAL)
@@ -0,0 +1,111 @@
+# Range-partition the IntegrationLog table by created_at on PostgreSQL
+
+import datetime
+
+from django.db import migrations
+
+TABLE = 'integrations_integrationlog'
+OLD_TABLE = f'{TABLE}_old'
+SEQUENCE = f'{TABLE}_id_seq'
+
+# Monthly partitions created ahead of time; the integration log partitions task
+# keeps creating them afterwards
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _bound(month):
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _rebuild(schema_editor, partitioned):
+    """
+    Copy the table into a new one, partitioned by month or not, and recreate its
+    primary key, indexes and foreign keys. PostgreSQL requires the partition key
+    in the primary key, which becomes (id, created_at) on the partitioned table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    execute = schema_editor.execute
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index'
+            ' WHERE indrelid = %s::regclass AND NOT indisprimary',
+            [TABLE],
+        )
+        # Indexes of a partitioned table are defined ON ONLY the parent
+        indexes = [
+            definition.replace(' ON ONLY ', ' ON ')
+            for (definition,) in cursor.fetchall()
+        ]
+        cursor.execute(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint'
+            " WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+
+    execute(f'ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}')
+
+    if partitioned:
+        execute(f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE}) PARTITION BY RANGE (created_at)')
+
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT min(created_at) AT TIME ZONE 'UTC' FROM {OLD_TABLE}")
+            oldest = cursor.fetchone()[0]
+        current = datetime.datetime.now(datetime.timezone.utc).date().replace(day=1)
+        month = min(oldest.date().replace(day=1), current) if oldest else current
+        while month <= _add_months(current, PARTITIONS_AHEAD):
+            execute(
+                f'CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE}'
+                f' FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})'
+            )
+            month = _add_months(month, 1)
+        execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+    else:
+        execute(f'CREATE TABLE {TABLE} (LIKE {OLD_TABLE})')
+
+    execute(f'INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}')
+    # Also drops the old partitions or identity sequence, freeing their names
+    execute(f'DROP TABLE {OLD_TABLE}')
+
+    if partitioned:
+        execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)')
+        execute(f'CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+    else:
+        execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id)')
+        execute(f'ALTER TABLE {TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+    execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'),"
+        f' coalesce(max(id), 0) + 1, false) FROM {TABLE}'
+    )
+
+    for definition in indexes:
+        execute(definition)
+    for name, definition in foreign_keys:
+        execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+
+def partition(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_alter_integration_integration_type'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
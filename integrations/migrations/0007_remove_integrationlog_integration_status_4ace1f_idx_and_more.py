@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audiences', '0006_subscriber_subscriber_email_upper_idx'),
+        ('integrations', '0006_partition_integrationlog'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='integrationlog',
+            name='integration_status_4ace1f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(
+                fields=['status', '-created_at'], name='integration_status_eab5ae_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(
+                fields=['integration', 'status', '-created_at'],
+                name='integration_integra_49ab36_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+import integrations.registry
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0007_remove_integrationlog_integration_status_4ace1f_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='integration',
+            name='integration_type',
+            field=models.CharField(choices=integrations.registry.IntegrationRegistry.choices, help_text='The provider type (e.g. loops)', max_length=50),
+        ),
+    ]
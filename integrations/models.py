@@ -7,17 +7,12 @@ class Integration(models.Model):
     Represents a configured integration provider (e.g. a Loops account with an API key).
     """
 
-    INTEGRATION_TYPE_CHOICES = [
-        (key, key.replace("_", " ").title())
-        for key in IntegrationRegistry.list_integrations()
-    ]
-
     name = models.CharField(
         max_length=255, help_text="Friendly name for this integration"
     )
     integration_type = models.CharField(
         max_length=50,
-        choices=INTEGRATION_TYPE_CHOICES,
+        choices=IntegrationRegistry.choices,
         help_text="The provider type (e.g. loops)",
     )
     config = models.JSONField(
@@ -98,10 +93,14 @@ class IntegrationLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
+        # On PostgreSQL the table is partitioned by month of created_at, and its
+        # primary key is (id, created_at); see integrations.partitions.
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["status"]),
             models.Index(fields=["created_at"]),
+            # Newest-first lists filtered by status, and by integration
+            models.Index(fields=["status", "-created_at"]),
+            models.Index(fields=["integration", "status", "-created_at"]),
         ]
 
     def __str__(self):
@@ -0,0 +1,163 @@
+import logging
+import re
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from integrations.models import IntegrationLog
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+# On PostgreSQL the IntegrationLog table is range-partitioned by created_at,
+# one partition per month (see migration 0006), plus a default partition that
+# only receives rows when no monthly partition exists for them.
+TABLE = IntegrationLog._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def _add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def _bound(month):
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned():
+    """Whether the IntegrationLog table is partitioned (PostgreSQL only)."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Return the monthly partitions as a {month: table name} dict."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def create_partition(month):
+    """
+    Create the partition of a month. Rows of that month that already landed in
+    the default partition are moved into it.
+    """
+    name = partition_name(month)
+    lower, upper = _bound(month), _bound(_add_months(month, 1))
+    in_range = f"created_at >= {lower} AND created_at < {upper}"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE}"
+                f" FOR VALUES FROM ({lower}) TO ({upper})"
+            )
+            return
+
+        log.warning(f"Moving rows from {DEFAULT_PARTITION} to the new partition {name}")
+        cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *)"
+            f" INSERT INTO {name} SELECT * FROM moved"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {name}"
+            f" FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+
+
+def ensure_partitions(months_ahead=None, dry_run=False):
+    """
+    Create the partitions of the current month and of the next `months_ahead`
+    months (INTEGRATION_LOG_PARTITIONS_AHEAD by default) that don't exist yet.
+    Returns the names of the partitions created.
+    """
+    if months_ahead is None:
+        months_ahead = settings.INTEGRATION_LOG_PARTITIONS_AHEAD
+
+    existing = list_partitions()
+    current = timezone.now().date().replace(day=1)
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(current, offset)
+        if month in existing:
+            continue
+        if not dry_run:
+            create_partition(month)
+        created.append(partition_name(month))
+    return created
+
+
+def drop_expired(retention_days=None, dry_run=False):
+    """
+    Drop the monthly partitions whose rows are all older than `retention_days`
+    (INTEGRATION_LOG_RETENTION_DAYS by default; 0 keeps the logs forever).
+    A month is only dropped once its last day has expired, so logs are kept for
+    up to a month longer than the retention. Returns the names of the dropped
+    partitions.
+    """
+    if retention_days is None:
+        retention_days = settings.INTEGRATION_LOG_RETENTION_DAYS
+    if not retention_days:
+        return []
+
+    cutoff = (timezone.now() - timedelta(days=retention_days)).date()
+
+    dropped = []
+    for month, name in list_partitions().items():
+        if _add_months(month, 1) > cutoff:
+            break
+        if not dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {name}")
+        dropped.append(name)
+    return dropped
+
+
+def delete_expired(retention_days=None, dry_run=False):
+    """
+    Retention for a table that isn't partitioned (e.g. on SQLite): delete the
+    logs older than `retention_days`. Returns the number of logs deleted.
+    """
+    if retention_days is None:
+        retention_days = settings.INTEGRATION_LOG_RETENTION_DAYS
+    if not retention_days:
+        return 0
+
+    expired = IntegrationLog.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=retention_days)
+    )
+    if dry_run:
+        return expired.count()
+    deleted, _ = expired.delete()
+    return deleted
@@ -1,4 +1,3 @@
-import requests
 import logging
 from integrations.base import BaseIntegration
 
@@ -9,6 +8,8 @@ log = logging.getLogger(__name__)
 class LoopsIntegration(BaseIntegration):
     """Loops.so integration"""
 
+    idempotent = True
+
     @classmethod
     def config_schema(cls):
         return {
@@ -19,7 +20,8 @@ class LoopsIntegration(BaseIntegration):
         required = ["api_key"]
         return all(key in self.config for key in required)
 
-    def execute(self, subscriber, audience_settings=None):
+    def _build_request(self, subscriber, audience_settings=None):
+        """Return the URL and keyword arguments of the create-contact request."""
         log.info(f"Executing Loops integration for subscriber: {subscriber.email}")
 
         if not self.validate_config():
@@ -45,13 +47,23 @@ class LoopsIntegration(BaseIntegration):
         if audience_settings:
             data.update(audience_settings.get("custom_fields", {}))
 
-        response = requests.post(url, json=data, headers=headers)
+        return url, {"json": data, "headers": headers}
+
+    def _handle_response(self, response):
+        response.raise_for_status()
         result = response.json()
         log.debug(f"Loops response: {result}")
-        response.raise_for_status()
 
         if not result.get("success", False):
             message = result.get("message", "Unknown error from Loops API")
             raise ValueError(f"Loops API error: {message}")
 
         return result
+
+    def execute(self, subscriber, audience_settings=None):
+        url, kwargs = self._build_request(subscriber, audience_settings)
+        return self._handle_response(self.http_post(url, **kwargs))
+
+    async def aexecute(self, subscriber, audience_settings=None):
+        url, kwargs = self._build_request(subscriber, audience_settings)
+        return self._handle_response(await self.ahttp_post(url, **kwargs))
@@ -1,15 +1,24 @@
 import hashlib
-import requests
 import logging
+from collections import defaultdict
 from integrations.base import BaseIntegration
 
 # Initialize the logger
 log = logging.getLogger(__name__)
 
 
+# Maximum number of members per batch subscribe or static segment request
+BATCH_SIZE = 500
+
+
 class MailchimpIntegration(BaseIntegration):
     """Mailchimp integration"""
 
+    idempotent = True
+    supports_batch = True
+    # Static segments (tags) listed per request, the API's maximum
+    SEGMENTS_PAGE_SIZE = 1000
+
     @classmethod
     def config_schema(cls):
         return {
@@ -31,17 +40,7 @@ class MailchimpIntegration(BaseIntegration):
     def _subscriber_hash(self, email):
         return hashlib.md5(email.lower().encode()).hexdigest()
 
-    def execute(self, subscriber, audience_settings=None):
-        log.info(f"Executing Mailchimp integration for subscriber: {subscriber.email}")
-
-        if not self.validate_config():
-            log.error("Invalid Mailchimp configuration")
-            raise ValueError("Invalid Mailchimp configuration")
-
-        list_id = self.config["list_id"]
-        base_url = self._get_base_url()
-        auth = self._get_auth()
-
+    def _member_data(self, subscriber):
         merge_fields = {
             "FNAME": subscriber.first_name or "",
             "LNAME": subscriber.last_name or "",
@@ -49,39 +48,214 @@ class MailchimpIntegration(BaseIntegration):
         if subscriber.phone:
             merge_fields["PHONE"] = subscriber.phone
 
-        data = {
+        return {
             "email_address": subscriber.email,
             "status": "subscribed",
             "merge_fields": merge_fields,
         }
 
+    def _member_request(self, subscriber):
+        """Return the URL and keyword arguments of the add-member request."""
+        log.info(f"Executing Mailchimp integration for subscriber: {subscriber.email}")
+
+        if not self.validate_config():
+            log.error("Invalid Mailchimp configuration")
+            raise ValueError("Invalid Mailchimp configuration")
+
+        list_id = self.config["list_id"]
+        base_url = self._get_base_url()
+
+        data = self._member_data(subscriber)
+
         log.debug(f"Mailchimp member data to send: {data}")
 
         url = f"{base_url}/lists/{list_id}/members"
-        response = requests.post(url, json=data, auth=auth)
-        result = response.json()
-        log.debug(f"Mailchimp response: {result}")
+        return url, {"json": data, "auth": self._get_auth()}
 
+    def _handle_member_response(self, response):
         if response.status_code not in (200, 400):
             response.raise_for_status()
 
+        result = response.json()
+        log.debug(f"Mailchimp response: {result}")
+
         # 400 with title "Member Exists" is acceptable (already subscribed)
         if response.status_code == 400 and result.get("title") != "Member Exists":
             raise ValueError(f"Mailchimp API error: {result.get('detail', result.get('title', 'Unknown error'))}")
 
+        return result
+
+    def _tags_request(self, subscriber):
+        """Return the URL and keyword arguments of the tags request, or None without tags."""
         # Apply tags from subscriber's custom_data if present
         tags = (subscriber.custom_data or {}).get("tags", [])
-        if tags:
-            log.debug(f"Adding Mailchimp tags: {tags}")
-            subscriber_hash = self._subscriber_hash(subscriber.email)
-            tags_url = f"{base_url}/lists/{list_id}/members/{subscriber_hash}/tags"
-            tags_payload = {
-                "tags": [{"name": tag, "status": "active"} for tag in tags]
-            }
-            tags_response = requests.post(tags_url, json=tags_payload, auth=auth)
-            log.debug(f"Mailchimp tags response status: {tags_response.status_code}")
-            if tags_response.status_code != 204:
-                tags_result = tags_response.json()
-                raise ValueError(f"Mailchimp tags error: {tags_result.get('detail', tags_result.get('title', 'Unknown error'))}")
+        if not tags:
+            return None
+
+        log.debug(f"Adding Mailchimp tags: {tags}")
+        subscriber_hash = self._subscriber_hash(subscriber.email)
+        tags_url = f"{self._get_base_url()}/lists/{self.config['list_id']}/members/{subscriber_hash}/tags"
+        tags_payload = {
+            "tags": [{"name": tag, "status": "active"} for tag in tags]
+        }
+        return tags_url, {"json": tags_payload, "auth": self._get_auth()}
+
+    def _handle_tags_response(self, tags_response):
+        log.debug(f"Mailchimp tags response status: {tags_response.status_code}")
+        if tags_response.status_code != 204:
+            # Outage responses may not be JSON, and are retried
+            if tags_response.status_code == 429 or tags_response.status_code >= 500:
+                tags_response.raise_for_status()
+            tags_result = tags_response.json()
+            raise ValueError(f"Mailchimp tags error: {tags_result.get('detail', tags_result.get('title', 'Unknown error'))}")
+
+    def execute(self, subscriber, audience_settings=None):
+        url, kwargs = self._member_request(subscriber)
+        result = self._handle_member_response(self.http_post(url, **kwargs))
+
+        tags_request = self._tags_request(subscriber)
+        if tags_request:
+            url, kwargs = tags_request
+            self._handle_tags_response(self.http_post(url, **kwargs))
 
         return result
+
+    async def aexecute(self, subscriber, audience_settings=None):
+        url, kwargs = self._member_request(subscriber)
+        result = self._handle_member_response(await self.ahttp_post(url, **kwargs))
+
+        tags_request = self._tags_request(subscriber)
+        if tags_request:
+            url, kwargs = tags_request
+            self._handle_tags_response(await self.ahttp_post(url, **kwargs))
+
+        return result
+
+    def execute_many(self, subscribers, audience_settings=None):
+        """
+        Add several subscribers to the list with batch subscribe requests of up to
+        BATCH_SIZE members, then apply their tags with one static segment request
+        per tag. Returns one result or exception per subscriber, in order.
+        """
+        log.info(f"Executing Mailchimp integration for {len(subscribers)} subscribers")
+
+        if not self.validate_config():
+            log.error("Invalid Mailchimp configuration")
+            return [ValueError("Invalid Mailchimp configuration")] * len(subscribers)
+
+        results = []
+        for start in range(0, len(subscribers), BATCH_SIZE):
+            results.extend(self._batch_subscribe(subscribers[start:start + BATCH_SIZE]))
+
+        # Tag members by tag name rather than one request per member
+        tagged = defaultdict(list)
+        for index, subscriber in enumerate(subscribers):
+            if isinstance(results[index], Exception):
+                continue
+            for tag in (subscriber.custom_data or {}).get("tags", []):
+                tagged[tag].append(index)
+
+        if tagged:
+            try:
+                segments = self._get_tag_segments(list(tagged))
+            except (OSError, ValueError) as exc:
+                # requests' exceptions are OSErrors
+                segments = {}
+                for indexes in tagged.values():
+                    for index in indexes:
+                        results[index] = exc
+
+            for tag, segment_id in segments.items():
+                indexes = tagged[tag]
+                for start in range(0, len(indexes), BATCH_SIZE):
+                    chunk = indexes[start:start + BATCH_SIZE]
+                    errors = self._add_segment_members(segment_id, [subscribers[index] for index in chunk])
+                    for index in chunk:
+                        error = errors.get(subscribers[index].email.lower())
+                        if error is not None:
+                            results[index] = error
+
+        return results
+
+    def _batch_subscribe(self, subscribers):
+        url = f"{self._get_base_url()}/lists/{self.config['list_id']}"
+        data = {
+            "members": [self._member_data(subscriber) for subscriber in subscribers],
+            "update_existing": False,
+        }
+
+        log.debug(f"Mailchimp batch subscribe of {len(subscribers)} members")
+
+        try:
+            response = self.http_post(url, json=data, auth=self._get_auth())
+            response.raise_for_status()
+            result = response.json()
+        except (OSError, ValueError) as exc:
+            log.error(f"Mailchimp batch subscribe error: {exc}")
+            return [exc] * len(subscribers)
+
+        members = {member["email_address"].lower(): member for member in result.get("new_members", [])}
+        errors = {error["email_address"].lower(): error for error in result.get("errors", [])}
+
+        results = []
+        for subscriber in subscribers:
+            email = subscriber.email.lower()
+            error = errors.get(email)
+            # Already subscribed is acceptable, like "Member Exists" for a single member
+            if error is not None and error.get("error_code") != "ERROR_CONTACT_EXISTS":
+                results.append(ValueError(f"Mailchimp API error: {error.get('error', 'Unknown error')}"))
+            else:
+                results.append(members.get(email) or error)
+        return results
+
+    def _get_tag_segments(self, tags):
+        """Return the static segment (tag) ids of the list by tag name, creating the missing ones."""
+        url = f"{self._get_base_url()}/lists/{self.config['list_id']}/segments"
+        segments = {}
+        offset = 0
+        # Page through the segments until every tag is found or none are left
+        while not all(tag in segments for tag in tags):
+            response = self.http_get(
+                url,
+                params={
+                    "type": "static",
+                    "count": self.SEGMENTS_PAGE_SIZE,
+                    "offset": offset,
+                    "fields": "segments.id,segments.name,total_items",
+                },
+                auth=self._get_auth(),
+            )
+            response.raise_for_status()
+            result = response.json()
+            page = result.get("segments", [])
+            segments.update((segment["name"], segment["id"]) for segment in page)
+            offset += len(page)
+            if not page or offset >= result.get("total_items", 0):
+                break
+
+        for tag in tags:
+            if tag not in segments:
+                response = self.http_post(url, json={"name": tag, "static_segment": []}, auth=self._get_auth())
+                response.raise_for_status()
+                segments[tag] = response.json()["id"]
+
+        return {tag: segments[tag] for tag in tags}
+
+    def _add_segment_members(self, segment_id, subscribers):
+        """Add members to a static segment, returning an error per failed email."""
+        url = f"{self._get_base_url()}/lists/{self.config['list_id']}/segments/{segment_id}"
+        data = {"members_to_add": [subscriber.email for subscriber in subscribers]}
+
+        try:
+            response = self.http_post(url, json=data, auth=self._get_auth())
+            response.raise_for_status()
+            result = response.json()
+        except (OSError, ValueError) as exc:
+            log.error(f"Mailchimp tags error: {exc}")
+            return {subscriber.email.lower(): exc for subscriber in subscribers}
+
+        errors = {}
+        for error in result.get("errors", []):
+            for email in error.get("email_addresses", []):
+                errors[email.lower()] = ValueError(f"Mailchimp tags error: {error.get('error', 'Unknown error')}")
+        return errors
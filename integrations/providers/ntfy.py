@@ -1,4 +1,3 @@
-import requests
 import logging
 from integrations.base import BaseIntegration
 
@@ -7,6 +6,9 @@ log = logging.getLogger(__name__)
 
 DEFAULT_NTFY_SERVER = "https://ntfy.sh"
 
+# Subscribers listed in a digest notification, the others are only counted
+DIGEST_MAX_LINES = 30
+
 SUPPORTED_LANGUAGES = ("en", "es")
 
 TRANSLATIONS = {
@@ -19,6 +21,8 @@ TRANSLATIONS = {
         "message": "Message",
         "audience": "Audience",
         "source": "Source",
+        "digest_title": "{count} New Subscribers",
+        "digest_more": "…and {count} more",
     },
     "es": {
         "title": "Nuevo Suscriptor: {email}",
@@ -29,6 +33,8 @@ TRANSLATIONS = {
         "message": "Mensaje",
         "audience": "Audiencia",
         "source": "Origen",
+        "digest_title": "{count} Nuevos Suscriptores",
+        "digest_more": "…y {count} más",
     },
 }
 
@@ -36,6 +42,8 @@ TRANSLATIONS = {
 class NtfyIntegration(BaseIntegration):
     """ntfy.sh push-notification integration — sends a notification when a new subscriber is added."""
 
+    supports_digest = True
+
     @classmethod
     def config_schema(cls):
         return {
@@ -57,22 +65,15 @@ class NtfyIntegration(BaseIntegration):
             lang = "en"
         return TRANSLATIONS[lang]
 
-    def execute(self, subscriber, audience_settings=None):
+    def _build_request(self, subscriber, audience_settings=None):
+        """Return the URL and keyword arguments of the publish request, and the topic."""
         log.info(f"Executing ntfy notification for subscriber: {subscriber.email}")
 
         if not self.validate_config():
             log.error("Invalid ntfy configuration")
             raise ValueError("Invalid ntfy configuration")
 
-        server_url = self.config.get("server_url", DEFAULT_NTFY_SERVER).rstrip("/")
-        topic = self.config["topic"]
-        access_token = self.config.get("access_token")
-
-        # Allow audience-level overrides
-        if audience_settings:
-            topic = audience_settings.get("topic", topic)
-
-        url = f"{server_url}/{topic}"
+        url, topic = self._get_target(audience_settings)
 
         audience_name = subscriber.audience.name if subscriber.audience else "Unknown"
         source_domain = subscriber.source.domain if subscriber.source else "N/A"
@@ -95,17 +96,34 @@ class NtfyIntegration(BaseIntegration):
             f"{t['source']}:     {source_domain}"
         )
 
+        log.debug(f"Sending ntfy notification to {url}")
+
+        return url, self._request_kwargs(title, message), topic
+
+    def _get_target(self, audience_settings=None):
+        """Return the topic URL and the topic, with audience-level overrides."""
+        server_url = self.config.get("server_url", DEFAULT_NTFY_SERVER).rstrip("/")
+        topic = self.config["topic"]
+
+        # Allow audience-level overrides
+        if audience_settings:
+            topic = audience_settings.get("topic", topic)
+
+        return f"{server_url}/{topic}", topic
+
+    def _request_kwargs(self, title, message):
         headers = {
             "Title": title,
             "Tags": "incoming_envelope",
         }
 
+        access_token = self.config.get("access_token")
         if access_token:
             headers["Authorization"] = f"Bearer {access_token}"
 
-        log.debug(f"Sending ntfy notification to {url}")
+        return {"data": message.encode("utf-8"), "headers": headers}
 
-        response = requests.post(url, data=message.encode("utf-8"), headers=headers)
+    def _handle_response(self, response, topic):
         response.raise_for_status()
 
         result = response.json()
@@ -113,3 +131,43 @@ class NtfyIntegration(BaseIntegration):
         log.info(f"ntfy notification sent to topic '{topic}'")
 
         return {"success": True, "topic": topic, "id": result.get("id")}
+
+    def execute(self, subscriber, audience_settings=None):
+        url, kwargs, topic = self._build_request(subscriber, audience_settings)
+        return self._handle_response(self.http_post(url, **kwargs), topic)
+
+    async def aexecute(self, subscriber, audience_settings=None):
+        url, kwargs, topic = self._build_request(subscriber, audience_settings)
+        return self._handle_response(await self.ahttp_post(url, **kwargs), topic)
+
+    def execute_digest(self, subscribers, audience_settings=None):
+        """Send one summary notification listing several new subscribers."""
+        log.info(f"Executing ntfy digest for {len(subscribers)} subscribers")
+
+        if not self.validate_config():
+            log.error("Invalid ntfy configuration")
+            raise ValueError("Invalid ntfy configuration")
+
+        url, topic = self._get_target(audience_settings)
+
+        t = self._get_translations()
+
+        title = t["digest_title"].format(count=len(subscribers))
+
+        # Keep the message well within ntfy's size limit
+        lines = []
+        for subscriber in subscribers[:DIGEST_MAX_LINES]:
+            name = " ".join(filter(None, [subscriber.first_name, subscriber.last_name]))
+            source_domain = subscriber.source.domain if subscriber.source else "N/A"
+            lines.append(f"{subscriber.email} — {name or '—'} ({source_domain})")
+        if len(subscribers) > DIGEST_MAX_LINES:
+            lines.append(
+                t["digest_more"].format(count=len(subscribers) - DIGEST_MAX_LINES)
+            )
+
+        log.debug(f"Sending ntfy digest to {url}")
+
+        response = self.http_post(url, **self._request_kwargs(title, "\n".join(lines)))
+        result = self._handle_response(response, topic)
+        result["digest"] = len(subscribers)
+        return result
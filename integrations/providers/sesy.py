@@ -1,4 +1,3 @@
-import requests
 import logging
 from integrations.base import BaseIntegration
 
@@ -9,6 +8,8 @@ log = logging.getLogger(__name__)
 class SesyIntegration(BaseIntegration):
     """Sesy email campaign integration"""
 
+    idempotent = True
+
     @classmethod
     def config_schema(cls):
         return {
@@ -21,7 +22,8 @@ class SesyIntegration(BaseIntegration):
         required = ["api_key", "project_pk", "base_url"]
         return all(key in self.config for key in required)
 
-    def execute(self, subscriber, audience_settings=None):
+    def _build_request(self, subscriber, audience_settings=None):
+        """Return the URL and keyword arguments of the create-member request."""
         log.info(f"Executing Sesy integration for subscriber: {subscriber.email}")
 
         if not self.validate_config():
@@ -53,9 +55,19 @@ class SesyIntegration(BaseIntegration):
 
         log.debug(f"Sesy data to send: {data}")
 
-        response = requests.post(url, json=data, headers=headers)
+        return url, {"json": data, "headers": headers}
+
+    def _handle_response(self, response):
         log.debug(f"Sesy response status: {response.status_code}")
         response.raise_for_status()
 
         result = response.json() if response.content else {}
         return result
+
+    def execute(self, subscriber, audience_settings=None):
+        url, kwargs = self._build_request(subscriber, audience_settings)
+        return self._handle_response(self.http_post(url, **kwargs))
+
+    async def aexecute(self, subscriber, audience_settings=None):
+        url, kwargs = self._build_request(subscriber, audience_settings)
+        return self._handle_response(await self.ahttp_post(url, **kwargs))
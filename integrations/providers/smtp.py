@@ -2,6 +2,7 @@ import smtplib
 import logging
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from integrations import smtp_pool
 from integrations.base import BaseIntegration
 
 # Initialize the logger
@@ -21,6 +22,8 @@ TRANSLATIONS = {
         "message": "Message",
         "audience": "Audience",
         "source": "Source",
+        "digest_subject": "{count} New Subscribers",
+        "digest_heading": "New Subscribers",
     },
     "es": {
         "subject": "Nuevo Suscriptor: {email}",
@@ -33,6 +36,8 @@ TRANSLATIONS = {
         "message": "Mensaje",
         "audience": "Audiencia",
         "source": "Origen",
+        "digest_subject": "{count} Nuevos Suscriptores",
+        "digest_heading": "Nuevos Suscriptores",
     },
 }
 
@@ -40,6 +45,9 @@ TRANSLATIONS = {
 class SMTPIntegration(BaseIntegration):
     """SMTP email notification integration — sends an email when a new subscriber is added."""
 
+    supports_batch = True
+    supports_digest = True
+
     @classmethod
     def config_schema(cls):
         return {
@@ -54,6 +62,7 @@ class SMTPIntegration(BaseIntegration):
             "language": "en",
             "subject": "",
             "heading": "",
+            "digest_subject": "",
         }
 
     def validate_config(self):
@@ -67,19 +76,17 @@ class SMTPIntegration(BaseIntegration):
             lang = "en"
         return TRANSLATIONS[lang]
 
-    def execute(self, subscriber, audience_settings=None):
-        log.info(f"Executing SMTP notification for subscriber: {subscriber.email}")
-
-        if not self.validate_config():
-            log.error("Invalid SMTP configuration")
-            raise ValueError("Invalid SMTP configuration")
+    def _connection_params(self):
+        return {
+            "host": self.config["host"],
+            "port": int(self.config.get("port", 587)),
+            "security": self.config.get("security", "starttls").lower(),
+            "username": self.config.get("username"),
+            "password": self.config.get("password"),
+        }
 
-        host = self.config["host"]
-        port = int(self.config.get("port", 587))
-        username = self.config.get("username")
-        password = self.config.get("password")
-        security = self.config.get("security", "starttls").lower()
-        from_email = self.config["from_email"]
+    def _get_recipients(self, audience_settings=None):
+        """Return the (to, bcc) recipient addresses, with audience-level overrides."""
         to_email = self.config["to_email"]
 
         bcc_email = self.config.get("bcc_email", "")
@@ -94,6 +101,20 @@ class SMTPIntegration(BaseIntegration):
             raise ValueError("No valid recipient addresses provided")
 
         bcc_recipients = [addr.strip() for addr in bcc_email.split(",") if addr.strip()]
+        return recipients, bcc_recipients
+
+    def _new_message(self, subject, recipients, bcc_recipients):
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = self.config["from_email"]
+        msg["To"] = ", ".join(recipients)
+        if bcc_recipients:
+            msg["Bcc"] = ", ".join(bcc_recipients)
+        return msg
+
+    def _build_message(self, subscriber, audience_settings=None):
+        """Return the (envelope recipients, message, result) for a subscriber's notification."""
+        recipients, bcc_recipients = self._get_recipients(audience_settings)
 
         audience_name = subscriber.audience.name if subscriber.audience else "Unknown"
         source_domain = subscriber.source.domain if subscriber.source else "N/A"
@@ -101,17 +122,13 @@ class SMTPIntegration(BaseIntegration):
         t = self._get_translations()
 
         # Build the email
-        msg = MIMEMultipart("alternative")
         custom_subject = (audience_settings or {}).get("subject") or self.config.get("subject")
-        msg["Subject"] = (
+        subject = (
             custom_subject.format(email=subscriber.email)
             if custom_subject
             else t["subject"].format(email=subscriber.email)
         )
-        msg["From"] = from_email
-        msg["To"] = ", ".join(recipients)
-        if bcc_recipients:
-            msg["Bcc"] = ", ".join(bcc_recipients)
+        msg = self._new_message(subject, recipients, bcc_recipients)
 
         custom_heading = (audience_settings or {}).get("heading") or self.config.get("heading")
         heading = custom_heading if custom_heading else t["heading"]
@@ -149,23 +166,156 @@ class SMTPIntegration(BaseIntegration):
         msg.attach(MIMEText(text_body, "plain"))
         msg.attach(MIMEText(html_body, "html"))
 
-        log.debug(f"Sending SMTP notification to {recipients} via {host}:{port}")
+        result = {"success": True, "to_email": recipients, "bcc_email": bcc_recipients}
+        return recipients + bcc_recipients, msg, result
+
+    def execute(self, subscriber, audience_settings=None):
+        log.info(f"Executing SMTP notification for subscriber: {subscriber.email}")
+
+        if not self.validate_config():
+            log.error("Invalid SMTP configuration")
+            raise ValueError("Invalid SMTP configuration")
+
+        envelope, msg, result = self._build_message(subscriber, audience_settings)
+        self._send(envelope, msg)
+        log.info(f"SMTP notification sent to {result['to_email']}")
+        return result
+
+    def _send(self, envelope, msg):
+        """Send a message over a pooled connection."""
+        params = self._connection_params()
+
+        log.debug(
+            f"Sending SMTP notification to {envelope} via {params['host']}:{params['port']}"
+        )
+
+        # SMTPException or a socket error (refused, reset, timed out)
+        try:
+            server = smtp_pool.acquire(**params)
+        except OSError as exc:
+            log.error(f"SMTP error: {exc}")
+            raise ValueError(f"SMTP error: {exc}") from exc
 
         try:
-            if security == "ssl":
-                server = smtplib.SMTP_SSL(host, port)
-            else:
-                server = smtplib.SMTP(host, port)
-                if security == "starttls":
-                    server.starttls()
-
-            with server:
-                if username and password:
-                    server.login(username, password)
-                server.sendmail(from_email, recipients + bcc_recipients, msg.as_string())
-        except smtplib.SMTPException as exc:
+            server.sendmail(self.config["from_email"], envelope, msg.as_string())
+        except OSError as exc:
+            # Don't trust the session anymore, nor give it back to the pool
+            smtp_pool.discard(server)
             log.error(f"SMTP error: {exc}")
             raise ValueError(f"SMTP error: {exc}") from exc
 
-        log.info(f"SMTP notification sent to {recipients}")
-        return {"success": True, "to_email": recipients, "bcc_email": bcc_recipients}
+        smtp_pool.release(server, **params)
+
+    def execute_digest(self, subscribers, audience_settings=None):
+        """Send one summary email listing several new subscribers."""
+        log.info(f"Executing SMTP digest for {len(subscribers)} subscribers")
+
+        if not self.validate_config():
+            log.error("Invalid SMTP configuration")
+            raise ValueError("Invalid SMTP configuration")
+
+        recipients, bcc_recipients = self._get_recipients(audience_settings)
+
+        t = self._get_translations()
+
+        custom_subject = (audience_settings or {}).get("digest_subject") or self.config.get("digest_subject")
+        subject = (
+            custom_subject.format(count=len(subscribers))
+            if custom_subject
+            else t["digest_subject"].format(count=len(subscribers))
+        )
+        msg = self._new_message(subject, recipients, bcc_recipients)
+
+        custom_heading = (audience_settings or {}).get("heading") or self.config.get("heading")
+        heading = custom_heading if custom_heading else t["digest_heading"]
+
+        columns = ["email", "first_name", "last_name", "phone", "message", "audience", "source"]
+        rows = [
+            [
+                subscriber.email,
+                subscriber.first_name or "—",
+                subscriber.last_name or "—",
+                subscriber.phone or "—",
+                subscriber.message or "—",
+                subscriber.audience.name if subscriber.audience else "Unknown",
+                subscriber.source.domain if subscriber.source else "N/A",
+            ]
+            for subscriber in subscribers
+        ]
+
+        # Plain-text body: one block per subscriber
+        text_body = f"{heading}\n"
+        for row in rows:
+            text_body += "---------------------------\n"
+            text_body += "".join(f"{t[column]}: {value}\n" for column, value in zip(columns, row))
+
+        # HTML body: one table row per subscriber
+        header_cells = "".join(f'<th style="padding: 4px 12px; text-align: left;">{t[column]}</th>' for column in columns)
+        body_rows = "".join(
+            "<tr>" + "".join(f'<td style="padding: 4px 12px;">{value}</td>' for value in row) + "</tr>\n"
+            for row in rows
+        )
+        html_body = f"""\
+<html>
+<body style="font-family: sans-serif; color: #333;">
+  <h2>{heading}</h2>
+  <table style="border-collapse: collapse;">
+    <tr>{header_cells}</tr>
+    {body_rows}
+  </table>
+</body>
+</html>"""
+
+        msg.attach(MIMEText(text_body, "plain"))
+        msg.attach(MIMEText(html_body, "html"))
+
+        self._send(recipients + bcc_recipients, msg)
+        log.info(f"SMTP digest of {len(subscribers)} subscribers sent to {recipients}")
+        return {"success": True, "to_email": recipients, "bcc_email": bcc_recipients, "digest": len(subscribers)}
+
+    def execute_many(self, subscribers, audience_settings=None):
+        """
+        Send the notifications of several subscribers over one pooled, authenticated
+        session. Returns one result or exception per subscriber, in order.
+        """
+        log.info(f"Executing SMTP notifications for {len(subscribers)} subscribers")
+
+        if not self.validate_config():
+            log.error("Invalid SMTP configuration")
+            return [ValueError("Invalid SMTP configuration")] * len(subscribers)
+
+        params = self._connection_params()
+        results = []
+        server = None
+        for subscriber in subscribers:
+            try:
+                envelope, msg, result = self._build_message(subscriber, audience_settings)
+                for attempt in range(2):
+                    if server is None:
+                        server = smtp_pool.acquire(**params)
+                    try:
+                        server.sendmail(self.config["from_email"], envelope, msg.as_string())
+                        break
+                    except smtplib.SMTPServerDisconnected:
+                        # The relay dropped the session: reconnect once and resend
+                        smtp_pool.discard(server)
+                        server = None
+                        if attempt:
+                            raise
+                results.append(result)
+            except ValueError as exc:
+                results.append(exc)
+            except OSError as exc:
+                # SMTPException or a socket error: don't trust the session anymore
+                if server is not None:
+                    smtp_pool.discard(server)
+                    server = None
+                log.error(f"SMTP error: {exc}")
+                error = ValueError(f"SMTP error: {exc}")
+                error.__cause__ = exc
+                results.append(error)
+
+        if server is not None:
+            smtp_pool.release(server, **params)
+        log.info(f"SMTP notifications sent for {len(subscribers)} subscribers")
+        return results
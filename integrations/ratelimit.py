@@ -0,0 +1,114 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+# Refill the bucket for the time elapsed since the last call, then take the
+# requested tokens or return how long to wait for them. A request bigger than
+# the bucket is granted once the bucket is full, leaving it in debt. Uses the
+# Redis clock so that every worker agrees on the time.
+ACQUIRE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+
+local needed = math.min(requested, capacity)
+local wait = 0
+if tokens >= needed then
+    tokens = tokens - requested
+else
+    wait = (needed - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity + requested) / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RateLimited(Exception):
+    """A provider call was not made because its rate limit is exhausted."""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Rate limited, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+def parse_rate(value):
+    """
+    Parse a rate limit like "10/s", "600/m" or "5000/h" into requests per
+    second. A bare number is per second. Returns None for an empty value.
+    """
+    if not value:
+        return None
+    count, _, period = str(value).partition("/")
+    try:
+        rate = float(count) / PERIODS[period.strip().lower()[:1] or "s"]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return rate if rate > 0 else None
+
+
+class TokenBucket:
+    """
+    Token bucket shared by all the workers through Redis, for one Integration.
+    It refills at the configured rate and holds one second's worth of tokens
+    (at least one), so bursts stay under the provider's quota.
+    If Redis is unavailable calls aren't limited.
+    """
+
+    def __init__(self, integration_id, rate):
+        self.key = f"integrations:ratelimit:{integration_id}"
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+
+    @classmethod
+    def for_integration(cls, integration):
+        """Return the bucket of an Integration, or None if its config sets no "rate_limit"."""
+        try:
+            rate = parse_rate(integration.config.get("rate_limit"))
+        except ValueError as exc:
+            log.warning(
+                f"Ignoring the rate limit of integration {integration.id}: {exc}"
+            )
+            return None
+        return cls(integration.id, rate) if rate else None
+
+    def acquire(self, count=1):
+        """Take `count` tokens. Returns 0 on success, or the seconds to wait for them."""
+        try:
+            wait = get_redis().eval(
+                ACQUIRE_SCRIPT, 1, self.key, self.rate, self.capacity, count
+            )
+        except RedisError as exc:
+            log.warning(f"Rate limiter unavailable: {exc}")
+            return 0
+        return float(wait)
+
+    async def acquire_async(self, count=1):
+        """
+        Wait on the event loop until `count` tokens are taken. Raises RateLimited
+        when that would take longer than INTEGRATION_RATE_LIMIT_MAX_WAIT.
+        """
+        while True:
+            wait = self.acquire(count)
+            if not wait:
+                return
+            if wait > settings.INTEGRATION_RATE_LIMIT_MAX_WAIT:
+                raise RateLimited(wait)
+            await asyncio.sleep(wait)
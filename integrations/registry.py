@@ -1,44 +1,98 @@
-from integrations.providers.loops import LoopsIntegration
-from integrations.providers.ntfy import NtfyIntegration
-from integrations.providers.smtp import SMTPIntegration
-from integrations.providers.mailchimp import MailchimpIntegration
-from integrations.providers.sesy import SesyIntegration
+import logging
+from importlib.metadata import entry_points
 
-# ... import others
+from django.utils.module_loading import import_string
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+# Entry point group through which installed packages provide integrations, e.g.
+# in pyproject.toml:
+#   [project.entry-points."formrelay.integrations"]
+#   acme = "acme_formrelay.provider:AcmeIntegration"
+ENTRY_POINT_GROUP = "formrelay.integrations"
 
 
 class IntegrationRegistry:
-    """Registry for all available integrations"""
+    """
+    Registry for all available integrations. Providers are referenced by dotted
+    path and imported on first use, so loading the registry (e.g. for the model
+    choices) doesn't import every provider and its client libraries.
+    """
 
     _integrations = {
-        "loops": LoopsIntegration,
-        "ntfy": NtfyIntegration,
-        "smtp": SMTPIntegration,
-        "mailchimp": MailchimpIntegration,
-        "sesy": SesyIntegration,
+        "loops": "integrations.providers.loops.LoopsIntegration",
+        "ntfy": "integrations.providers.ntfy.NtfyIntegration",
+        "smtp": "integrations.providers.smtp.SMTPIntegration",
+        "mailchimp": "integrations.providers.mailchimp.MailchimpIntegration",
+        "sesy": "integrations.providers.sesy.SesyIntegration",
         # Add more here
     }
+    _classes = {}
+    _discovered = False
 
     @classmethod
-    def get_integration(cls, integration_type, config):
-        integration_class = cls._integrations.get(integration_type)
-        if not integration_class:
+    def _discover(cls):
+        """Add the integrations of the "formrelay.integrations" entry points, once."""
+        if cls._discovered:
+            return
+        cls._discovered = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name in cls._integrations:
+                log.warning(
+                    f"Ignoring entry point {entry_point.value}: "
+                    f"integration type '{entry_point.name}' already exists"
+                )
+                continue
+            cls._integrations[entry_point.name] = entry_point
+
+    @classmethod
+    def get_integration_class(cls, integration_type):
+        integration_class = cls._classes.get(integration_type)
+        if integration_class:
+            return integration_class
+
+        cls._discover()
+        target = cls._integrations.get(integration_type)
+        if not target:
             raise ValueError(f"Unknown integration type: {integration_type}")
-        return integration_class(config)
+        if isinstance(target, str):
+            integration_class = import_string(target)
+        elif isinstance(target, type):
+            integration_class = target
+        else:
+            integration_class = target.load()
+        cls._classes[integration_type] = integration_class
+        return integration_class
+
+    @classmethod
+    def get_integration(cls, integration_type, config):
+        return cls.get_integration_class(integration_type)(config)
 
     @classmethod
     def register(cls, name, integration_class):
-        """Allow dynamic registration of custom integrations"""
+        """Allow dynamic registration of custom integrations, as a class or a dotted path"""
         cls._integrations[name] = integration_class
+        cls._classes.pop(name, None)
 
     @classmethod
     def list_integrations(cls):
+        cls._discover()
         return list(cls._integrations.keys())
 
+    @classmethod
+    def choices(cls):
+        """
+        Choices of Integration.integration_type. Passed as a callable, so that
+        registering integrations doesn't change the field in migrations.
+        """
+        return [(key, key.replace("_", " ").title()) for key in cls.list_integrations()]
+
     @classmethod
     def get_config_schema(cls, integration_type):
         """Return the config schema template for a given integration type."""
-        integration_class = cls._integrations.get(integration_type)
-        if not integration_class:
+        try:
+            integration_class = cls.get_integration_class(integration_type)
+        except ValueError:
             return {}
-        return integration_class.config_schema()
+        return integration_class.get_config_schema()
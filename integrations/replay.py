@@ -0,0 +1,295 @@
+import json
+import time
+import uuid
+
+from django.conf import settings
+
+from audiences.filters import SubscriberFilter
+from audiences.models import Subscriber
+from core.redis_client import get_redis
+from integrations.models import AudienceIntegration, IntegrationLog
+
+# Sorted set of the replay ids, scored by the time they started
+INDEX_KEY = "integrations:replays"
+
+# Seconds between two checks of a replay that waits for its chunks to complete
+POLL_INTERVAL = 2
+
+# Seconds a finished or cancelled replay's progress is kept
+FINISHED_TTL = 7 * 24 * 3600
+
+# Fields of the replay hash holding numbers
+COUNTERS = [
+    "total",
+    "queued",
+    "processed",
+    "executed",
+    "in_flight",
+    "last_id",
+    "max_id",
+    "chunk_size",
+    "concurrency",
+]
+
+
+def _key(replay_id):
+    return f"integrations:replay:{replay_id}"
+
+
+def select_subscribers(audience_integration_ids, filters=None, log_status=None):
+    """
+    Return the subscribers of the audiences of the (active) audience
+    integrations, narrowed by SubscriberFilter `filters` and, with `log_status`,
+    to those with a log of that status for one of their integrations.
+    """
+    audience_integrations = AudienceIntegration.objects.filter(
+        id__in=audience_integration_ids, is_active=True
+    )
+    subscribers = Subscriber.objects.filter(
+        audience_id__in=audience_integrations.values("audience_id")
+    )
+    if filters:
+        filterset = SubscriberFilter(filters, queryset=subscribers)
+        if not filterset.is_valid():
+            raise ValueError(
+                "; ".join(
+                    f"{name}: {' '.join(errors)}"
+                    for name, errors in filterset.errors.items()
+                )
+            )
+        subscribers = filterset.qs
+    if log_status:
+        subscribers = subscribers.filter(
+            id__in=IntegrationLog.objects.filter(
+                status=log_status,
+                integration_id__in=audience_integrations.values("integration_id"),
+            ).values("subscriber_id")
+        )
+    return subscribers.order_by()
+
+
+def get_pairs(replay, subscriber_ids):
+    """
+    Return the (subscriber id, audience integration id) pairs of a replay's
+    chunk. With a log status, only the integrations that logged it for the
+    subscriber are replayed, and not those that have since succeeded.
+    """
+    audience_integrations = {}
+    for audience_integration in AudienceIntegration.objects.filter(
+        id__in=replay["audience_integrations"], is_active=True
+    ):
+        audience_integrations.setdefault(audience_integration.audience_id, []).append(
+            audience_integration
+        )
+
+    logged = None
+    if replay["log_status"]:
+        logs = IntegrationLog.objects.filter(subscriber_id__in=subscriber_ids)
+        logged = set(
+            logs.filter(status=replay["log_status"]).values_list(
+                "subscriber_id", "integration_id"
+            )
+        )
+        if replay["log_status"] != "success":
+            logged -= set(
+                logs.filter(status="success").values_list(
+                    "subscriber_id", "integration_id"
+                )
+            )
+
+    pairs = []
+    for subscriber_id, audience_id in Subscriber.objects.filter(
+        id__in=subscriber_ids
+    ).values_list("id", "audience_id"):
+        for audience_integration in audience_integrations.get(audience_id, []):
+            if logged is None or (
+                (subscriber_id, audience_integration.integration_id) in logged
+            ):
+                pairs.append((subscriber_id, audience_integration.id))
+    return pairs
+
+
+def start(
+    audience_integration_ids,
+    filters=None,
+    log_status=None,
+    chunk_size=None,
+    concurrency=None,
+    rate=None,
+):
+    """
+    Start replaying the integrations of the selected subscribers (see
+    select_subscribers()) and return the replay's id.
+
+    The replay_integrations task queues the subscribers in chunks of
+    `chunk_size` on INTEGRATION_REPLAY_QUEUE, with at most `concurrency` chunks
+    queued or running at a time and at most `rate` subscribers per second (0
+    for no limit). Live submissions keep their own queues, so a replay never
+    delays them; its progress is kept in Redis, see get().
+    """
+    from integrations.tasks import replay_integrations
+
+    filters = {name: value for name, value in (filters or {}).items() if value}
+    # Subscribers created from now on get their integrations as usual
+    max_id = Subscriber.objects.order_by("-id").values_list("id", flat=True).first()
+    total = (
+        select_subscribers(audience_integration_ids, filters, log_status)
+        .filter(id__lte=max_id or 0)
+        .count()
+    )
+
+    replay_id = uuid.uuid4().hex[:12]
+    now = time.time()
+    client = get_redis()
+    pipe = client.pipeline()
+    pipe.hset(
+        _key(replay_id),
+        mapping={
+            "status": "running",
+            "audience_integrations": json.dumps(list(audience_integration_ids)),
+            "filters": json.dumps(filters),
+            "log_status": log_status or "",
+            "chunk_size": chunk_size or settings.INTEGRATION_REPLAY_CHUNK_SIZE,
+            "concurrency": concurrency or settings.INTEGRATION_REPLAY_CONCURRENCY,
+            "rate": settings.INTEGRATION_REPLAY_RATE if rate is None else rate,
+            "total": total,
+            "queued": 0,
+            "processed": 0,
+            "executed": 0,
+            "in_flight": 0,
+            "last_id": 0,
+            "max_id": max_id or 0,
+            "next_at": now,
+            "started_at": now,
+        },
+    )
+    pipe.zadd(INDEX_KEY, {replay_id: now})
+    pipe.execute()
+
+    replay_integrations.apply_async(
+        (replay_id,), queue=settings.INTEGRATION_REPLAY_QUEUE
+    )
+    return replay_id
+
+
+def get(replay_id):
+    """Return the state of a replay, or None if it doesn't exist (anymore)."""
+    state = get_redis().hgetall(_key(replay_id))
+    if not state:
+        return None
+    replay = {key.decode(): value.decode() for key, value in state.items()}
+    for field in COUNTERS:
+        replay[field] = int(replay[field])
+    for field in ["rate", "next_at", "started_at"]:
+        replay[field] = float(replay[field])
+    replay["audience_integrations"] = json.loads(replay["audience_integrations"])
+    replay["filters"] = json.loads(replay["filters"])
+    replay["id"] = replay_id
+    return replay
+
+
+def describe(replay):
+    """One line summary of a replay's progress."""
+    return (
+        f"{replay['id']}: {replay['status']}, {replay['processed']}/{replay['total']} "
+        f"subscribers processed ({replay['queued']} queued), "
+        f"{replay['executed']} integrations run"
+    )
+
+
+def list_replays():
+    """Return the states of the known replays, most recent first."""
+    client = get_redis()
+    replays = []
+    for replay_id in client.zrevrange(INDEX_KEY, 0, -1):
+        replay = get(replay_id.decode())
+        if replay is None:
+            client.zrem(INDEX_KEY, replay_id)
+            continue
+        replays.append(replay)
+    return replays
+
+
+def _end(replay_id, status):
+    pipe = get_redis().pipeline()
+    pipe.hset(_key(replay_id), "status", status)
+    pipe.expire(_key(replay_id), FINISHED_TTL)
+    pipe.execute()
+
+
+def cancel(replay_id):
+    """Stop queueing chunks of a replay. Chunks already queued are skipped."""
+    if get(replay_id) is None:
+        return False
+    _end(replay_id, "cancelled")
+    return True
+
+
+def chunk_done(replay_id, subscribers, executed):
+    pipe = get_redis().pipeline()
+    pipe.hincrby(_key(replay_id), "in_flight", -1)
+    pipe.hincrby(_key(replay_id), "processed", subscribers)
+    pipe.hincrby(_key(replay_id), "executed", executed)
+    pipe.execute()
+
+
+def advance(replay_id, block=False):
+    """
+    Queue the next chunks of a replay, as far as its concurrency and rate allow.
+    Returns the seconds after which to call it again, or None once the replay
+    has ended. With `block`, waits instead of returning until it has ended.
+    """
+    from integrations.tasks import replay_integration_chunk
+
+    client = get_redis()
+    while True:
+        replay = get(replay_id)
+        if replay is None or replay["status"] != "running":
+            return None
+
+        wait = POLL_INTERVAL
+        if replay["in_flight"] < replay["concurrency"]:
+            wait = replay["next_at"] - time.time()
+        if wait <= 0:
+            subscriber_ids = list(
+                select_subscribers(
+                    replay["audience_integrations"],
+                    replay["filters"],
+                    replay["log_status"],
+                )
+                .filter(id__gt=replay["last_id"], id__lte=replay["max_id"])
+                .order_by("id")
+                .values_list("id", flat=True)[: replay["chunk_size"]]
+            )
+            if not subscriber_ids:
+                if replay["in_flight"] <= 0:
+                    _end(replay_id, "finished")
+                    return None
+                wait = POLL_INTERVAL
+            else:
+                rate = replay["rate"]
+                pipe = client.pipeline()
+                pipe.hincrby(_key(replay_id), "in_flight", 1)
+                pipe.hincrby(_key(replay_id), "queued", len(subscriber_ids))
+                pipe.hset(
+                    _key(replay_id),
+                    mapping={
+                        "last_id": subscriber_ids[-1],
+                        "next_at": (
+                            max(replay["next_at"], time.time())
+                            + len(subscriber_ids) / rate
+                            if rate
+                            else 0
+                        ),
+                    },
+                )
+                pipe.execute()
+                replay_integration_chunk.apply_async(
+                    (replay_id, subscriber_ids),
+                    queue=settings.INTEGRATION_REPLAY_QUEUE,
+                )
+                continue
+
+        if not block:
+            return wait
+        time.sleep(wait)
@@ -0,0 +1,127 @@
+import logging
+import random
+import smtplib
+
+import httpx
+import requests
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+
+def is_transient(exc):
+    """
+    Whether an integration error is worth retrying: connection errors, timeouts,
+    HTTP 429 and 5xx responses, and temporary SMTP failures. Providers wrap these
+    in ValueError, so the chain of causes is inspected too.
+    """
+    while exc is not None:
+        if isinstance(
+            exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+        ):
+            return True
+        if (
+            isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError))
+            and exc.response is not None
+        ):
+            status = exc.response.status_code
+            return status == 429 or status >= 500
+        if isinstance(exc, smtplib.SMTPResponseException):
+            # 4xx replies are temporary failures by definition
+            return 400 <= exc.smtp_code < 500
+        if isinstance(
+            exc, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+        ):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+def backoff(attempt):
+    """Exponential backoff with jitter, in seconds, before retry number `attempt` (0-based)."""
+    ceiling = min(
+        settings.INTEGRATION_RETRY_BACKOFF_MAX,
+        settings.INTEGRATION_RETRY_BACKOFF * 2**attempt,
+    )
+    return random.uniform(settings.INTEGRATION_RETRY_BACKOFF, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker shared by all the workers through Redis, for one Integration.
+
+    INTEGRATION_CIRCUIT_THRESHOLD transient failures within
+    INTEGRATION_CIRCUIT_WINDOW seconds open the circuit: calls are refused for
+    INTEGRATION_CIRCUIT_COOLDOWN seconds. Afterwards a single probe call is let
+    through; it closes the circuit on success and reopens it on failure.
+    If Redis is unavailable the circuit stays closed.
+    """
+
+    def __init__(self, integration_id):
+        prefix = f"integrations:circuit:{integration_id}"
+        self.failures_key = f"{prefix}:failures"
+        self.open_key = f"{prefix}:open"
+        self.half_open_key = f"{prefix}:half-open"
+        self.probe_key = f"{prefix}:probe"
+
+    def allow(self):
+        """Whether a call to the provider may be made now."""
+        try:
+            client = get_redis()
+            if client.exists(self.open_key):
+                return False
+            if client.exists(self.half_open_key):
+                # Cooldown is over: only one probe at a time
+                return bool(
+                    client.set(
+                        self.probe_key,
+                        1,
+                        nx=True,
+                        ex=int(settings.INTEGRATION_HTTP_TIMEOUT) + 30,
+                    )
+                )
+        except RedisError as exc:
+            log.warning(f"Circuit breaker unavailable: {exc}")
+        return True
+
+    def record_success(self):
+        try:
+            get_redis().delete(self.failures_key, self.half_open_key, self.probe_key)
+        except RedisError as exc:
+            log.warning(f"Circuit breaker unavailable: {exc}")
+
+    def record_failure(self):
+        try:
+            client = get_redis()
+            pipe = client.pipeline()
+            pipe.incr(self.failures_key)
+            pipe.exists(self.half_open_key)
+            failures, half_open = pipe.execute()
+            if failures == 1:
+                client.expire(self.failures_key, settings.INTEGRATION_CIRCUIT_WINDOW)
+            if half_open or failures >= settings.INTEGRATION_CIRCUIT_THRESHOLD:
+                self.trip(client)
+        except RedisError as exc:
+            log.warning(f"Circuit breaker unavailable: {exc}")
+
+    def trip(self, client):
+        log.warning(f"Opening circuit {self.open_key}")
+        pipe = client.pipeline()
+        pipe.set(self.open_key, 1, ex=settings.INTEGRATION_CIRCUIT_COOLDOWN)
+        pipe.set(self.half_open_key, 1)
+        pipe.delete(self.failures_key, self.probe_key)
+        pipe.execute()
+
+    def retry_in(self):
+        """Seconds until the circuit may let calls through again, with jitter."""
+        try:
+            remaining = get_redis().ttl(self.open_key)
+        except RedisError:
+            remaining = -1
+        if remaining is None or remaining < 0:
+            remaining = settings.INTEGRATION_CIRCUIT_COOLDOWN
+        return remaining + random.uniform(1, settings.INTEGRATION_RETRY_BACKOFF)
@@ -1,13 +1,23 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from audiences.models import Subscriber
+from audiences.signals import rebuilding_subscriber_stats, subscribers_created
+from integrations import stats
+from integrations.dispatch import dispatch_subscriber_integrations
 
 
 @receiver(post_save, sender=Subscriber)
 def trigger_integrations(sender, instance, created, **kwargs):
     if created:
-        # Import here to avoid circular dependency
-        from integrations.tasks import process_subscriber_integrations
+        # Queued once the transaction commits, so workers always see the row
+        dispatch_subscriber_integrations([instance.id])
 
-        # Queue async task (assuming Celery)
-        process_subscriber_integrations.delay(instance.id)
+
+@receiver(subscribers_created, sender=Subscriber)
+def trigger_bulk_integrations(sender, subscriber_ids, **kwargs):
+    dispatch_subscriber_integrations(subscriber_ids)
+
+
+@receiver(rebuilding_subscriber_stats)
+def rebuild_integration_stats(sender, start, end, **kwargs):
+    return stats.rows_between(start, end)
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+
+# Initialize the logger
+log = logging.getLogger(__name__)
+
+# Idle authenticated connections of this worker process, keyed by server and
+# credentials. Each entry is a list of (connection, last_used) tuples.
+_idle = {}
+_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def _key(host, port, security, username, password):
+    digest = hashlib.sha256(f"{username}:{password}".encode()).hexdigest()
+    return (host, port, security, digest)
+
+
+def _connect(host, port, security, username, password):
+    if security == "ssl":
+        server = smtplib.SMTP_SSL(host, port)
+    else:
+        server = smtplib.SMTP(host, port)
+        if security == "starttls":
+            server.starttls()
+
+    if username and password:
+        server.login(username, password)
+    return server
+
+
+def _is_alive(server):
+    # SMTPException is an OSError, like the socket errors of a dropped connection
+    try:
+        return server.noop()[0] == 250
+    except OSError:
+        return False
+
+
+def discard(server):
+    """Close a connection that shouldn't be reused."""
+    try:
+        server.quit()
+    except OSError:
+        server.close()
+
+
+def acquire(host, port, security, username=None, password=None):
+    """
+    Return an authenticated connection, reusing an idle one when possible.
+    Idle connections older than SMTP_POOL_IDLE_TIMEOUT are closed, the others
+    are checked with NOOP before being handed out.
+    """
+    global _pid
+
+    key = _key(host, port, security, username, password)
+    while True:
+        with _lock:
+            # Sockets can't be shared with the parent after a (prefork) fork
+            if os.getpid() != _pid:
+                _idle.clear()
+                _pid = os.getpid()
+            idle = _idle.get(key)
+            entry = idle.pop() if idle else None
+
+        if entry is None:
+            log.debug(f"Opening SMTP connection to {host}:{port}")
+            return _connect(host, port, security, username, password)
+
+        server, last_used = entry
+        if (
+            time.monotonic() - last_used <= settings.SMTP_POOL_IDLE_TIMEOUT
+            and _is_alive(server)
+        ):
+            return server
+        discard(server)
+
+
+def release(server, host, port, security, username=None, password=None):
+    """Return a healthy connection to the pool, or close it if the pool is full."""
+    key = _key(host, port, security, username, password)
+    with _lock:
+        idle = _idle.setdefault(key, [])
+        if len(idle) < settings.SMTP_POOL_SIZE:
+            idle.append((server, time.monotonic()))
+            return
+    discard(server)
@@ -0,0 +1,41 @@
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+
+from audiences import stats
+from integrations.models import IntegrationLog
+
+COMPLETED = ["success", "failed"]
+
+
+def log_rows(logs):
+    """
+    Count completed integration runs per audience and source of their
+    subscriber and (local) day of the log, for audiences.stats.increment().
+    """
+    return (
+        logs.filter(status__in=COMPLETED)
+        .order_by()
+        .values(
+            audience_id=F("subscriber__audience_id"),
+            source_id=F("subscriber__source_id"),
+            day=TruncDate("created_at"),
+        )
+        .annotate(
+            integrations_succeeded=Count("id", filter=Q(status="success")),
+            integrations_failed=Count("id", filter=Q(status="failed")),
+        )
+    )
+
+
+def record_logs(logs):
+    """Count the logs (saved IntegrationLogs) that completed in the daily stats."""
+    log_ids = [log.pk for log in logs if log.pk and log.status in COMPLETED]
+    if log_ids:
+        stats.increment(log_rows(IntegrationLog.objects.filter(id__in=log_ids)))
+
+
+def rows_between(start, end):
+    """Count the integration runs logged between `start` and `end`, for a rebuild."""
+    return log_rows(
+        IntegrationLog.objects.filter(created_at__gte=start, created_at__lt=end)
+    )
@@ -1,31 +1,639 @@
-from celery import shared_task
+import logging
+from collections import defaultdict
+
+from celery import group, shared_task
+from django.conf import settings
 from audiences.models import Subscriber
-from integrations.models import IntegrationLog
+from integrations import batching, digest, dispatch, engine, partitions, replay, stats
+from integrations.models import AudienceIntegration, IntegrationLog
+from integrations.ratelimit import RateLimited, TokenBucket
 from integrations.registry import IntegrationRegistry
+from integrations.resilience import CircuitBreaker, backoff, is_transient
 
+# Initialize the logger
+logger = logging.getLogger(__name__)
 
-@shared_task
-def process_subscriber_integrations(subscriber_id):
-    subscriber = Subscriber.objects.get(id=subscriber_id)
 
-    for audience_integration in subscriber.audience.integrations.filter(is_active=True):
-        integration = IntegrationRegistry.get_integration(
-            audience_integration.integration.integration_type,
-            audience_integration.integration.config,
+def _task_options(integration_type, queue=None):
+    """Route a provider's tasks to `queue`, or to its own queue when one is configured."""
+    queue = queue or settings.INTEGRATION_TASK_QUEUES.get(integration_type)
+    return {"queue": queue} if queue else {}
+
+
+def _fan_out(subscriber_ids):
+    """
+    Queue the integrations of the subscribers: one run_audience_integration task
+    per (subscriber, active integration), a single batch task per integration
+    whose provider supports it, and in "async" INTEGRATION_EXECUTION_MODE one
+    run_audience_integrations_async task for all the other pairs.
+    """
+    subscribers = list(
+        Subscriber.objects.filter(id__in=subscriber_ids).values_list(
+            "id", "audience_id"
+        )
+    )
+
+    audience_integrations = defaultdict(list)
+    for audience_integration in AudienceIntegration.objects.filter(
+        audience_id__in={audience_id for _, audience_id in subscribers},
+        is_active=True,
+    ).select_related("integration"):
+        audience_integrations[audience_integration.audience_id].append(
+            audience_integration
         )
 
-        log = IntegrationLog.objects.create(
+    signatures = []
+    async_pairs = []
+    for audience_id, subscriber_ids in _group_by_audience(subscribers).items():
+        for audience_integration in audience_integrations[audience_id]:
+            integration_type = audience_integration.integration.integration_type
+            options = _task_options(integration_type)
+            integration_class = IntegrationRegistry.get_integration_class(
+                integration_type
+            )
+
+            # Notifications with a digest window are aggregated into summaries
+            if integration_class.supports_digest and digest.get_window(
+                audience_integration
+            ):
+                digest.collect(audience_integration, subscriber_ids, options)
+                continue
+
+            # Integrations with a batch window collect the subscribers of
+            # several dispatches and handle them with execute_many()
+            if batching.get_window(audience_integration):
+                batching.collect(audience_integration, subscriber_ids, options)
+                continue
+
+            # Providers with a native bulk API handle a dispatch in one task
+            if integration_class.supports_batch and len(subscriber_ids) > 1:
+                signatures.append(
+                    run_audience_integration_batch.si(
+                        subscriber_ids, audience_integration.id
+                    ).set(**options)
+                )
+                continue
+
+            if settings.INTEGRATION_EXECUTION_MODE == "async":
+                async_pairs.extend(
+                    (subscriber_id, audience_integration.id)
+                    for subscriber_id in subscriber_ids
+                )
+                continue
+
+            signatures.extend(
+                run_audience_integration.si(subscriber_id, audience_integration.id).set(
+                    **options
+                )
+                for subscriber_id in subscriber_ids
+            )
+
+    if async_pairs:
+        signatures.append(run_audience_integrations_async.si(async_pairs))
+
+    if signatures:
+        group(signatures).apply_async()
+
+
+def _group_by_audience(subscribers):
+    subscriber_ids = defaultdict(list)
+    for subscriber_id, audience_id in subscribers:
+        subscriber_ids[audience_id].append(subscriber_id)
+    return subscriber_ids
+
+
+def _circuit_open(task, breaker):
+    # Eager (DEBUG) runs can't be deferred, they call the provider regardless
+    return not task.request.is_eager and not breaker.allow()
+
+
+def _should_retry(task, attempt):
+    return not task.request.is_eager and attempt < settings.INTEGRATION_MAX_RETRIES
+
+
+def _save_logs(logs):
+    """
+    Write the final state of logs: one bulk insert for the new ones and one bulk
+    update for those written as pending before the provider call. The completed
+    ones are counted in the daily subscriber stats.
+    """
+    new_logs = [log for log in logs if log.pk is None and log.status != "pending"]
+    marked_logs = [log for log in logs if log.pk is not None]
+    IntegrationLog.objects.bulk_create(new_logs)
+    IntegrationLog.objects.bulk_update(
+        marked_logs, ["status", "response_data", "error_message"]
+    )
+    stats.record_logs(new_logs + marked_logs)
+
+
+def _get_integration(integration):
+    """Instantiate the provider of an Integration, paced by its rate limit."""
+    provider = IntegrationRegistry.get_integration(
+        integration.integration_type, integration.config
+    )
+    provider.rate_limiter = TokenBucket.for_integration(integration)
+    return provider
+
+
+def _rate_limit_wait(task, provider):
+    """
+    Take a token for a provider call, or return the seconds to wait for one. The
+    task then retries for as long as the quota requires: waiting doesn't count
+    as an attempt.
+    """
+    # Eager (DEBUG) runs can't be deferred, like with _circuit_open()
+    if task.request.is_eager or provider.rate_limiter is None:
+        return 0
+    return provider.rate_limiter.acquire()
+
+
+# Celery doesn't cap the retries of the tasks calling providers: deferrals (open
+# circuit, rate limit) are retried as long as needed, and transient errors up to
+# INTEGRATION_MAX_RETRIES times, counted by their `attempt` argument
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def run_audience_integration(
+    self, subscriber_id, audience_integration_id, attempt=0, log_id=None
+):
+    """
+    Execute a single audience integration for a subscriber and log the result.
+
+    Transient errors are retried with exponential backoff, reusing the same log.
+    While the integration's circuit is open, or its rate limit is exhausted, the
+    task is deferred without calling the provider and without counting as an
+    attempt.
+    """
+    subscriber = Subscriber.objects.select_related("audience", "source").get(
+        id=subscriber_id
+    )
+    audience_integration = AudienceIntegration.objects.select_related(
+        "integration"
+    ).get(id=audience_integration_id)
+
+    breaker = CircuitBreaker(audience_integration.integration_id)
+    if _circuit_open(self, breaker):
+        raise self.retry(countdown=breaker.retry_in())
+
+    integration = _get_integration(audience_integration.integration)
+
+    # Out of tokens: come back when the rate limit allows another call
+    wait = _rate_limit_wait(self, integration)
+    if wait:
+        raise self.retry(countdown=wait)
+
+    if log_id is not None:
+        log = IntegrationLog.objects.get(id=log_id)
+    else:
+        log = IntegrationLog(
             subscriber=subscriber,
             integration=audience_integration.integration,
             status="pending",
         )
+        if not integration.idempotent:
+            log.save()
+
+    try:
+        result = integration.execute(subscriber, audience_integration.settings)
+        breaker.record_success()
+        log.status = "success"
+        log.response_data = result
+    except Exception as e:
+        log.status = "failed"
+        log.error_message = str(e)
+        # Permanent errors (e.g. a rejected email) leave the breaker as it is
+        if is_transient(e):
+            breaker.record_failure()
+            if _should_retry(self, attempt):
+                # Only a log written as pending is kept across retries
+                if log.pk is not None:
+                    log.status = "pending"
+                    log.save(update_fields=["error_message"])
+                raise self.retry(
+                    kwargs={"attempt": attempt + 1, "log_id": log.pk},
+                    countdown=backoff(attempt),
+                )
+
+    _save_logs([log])
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def run_audience_integration_batch(
+    self, subscriber_ids, audience_integration_id, attempt=0, log_ids=None
+):
+    """
+    Execute an audience integration for several subscribers with execute_many().
+    Subscribers that failed with a transient error are retried together, like
+    run_audience_integration does for a single one.
+    """
+    audience_integration = AudienceIntegration.objects.select_related(
+        "integration"
+    ).get(id=audience_integration_id)
+
+    breaker = CircuitBreaker(audience_integration.integration_id)
+    if _circuit_open(self, breaker):
+        raise self.retry(countdown=breaker.retry_in())
+
+    subscribers = list(
+        Subscriber.objects.filter(id__in=subscriber_ids).select_related(
+            "audience", "source"
+        )
+    )
+    integration = _get_integration(audience_integration.integration)
+
+    # A native bulk call counts as one request; otherwise execute_many() paces
+    # each call itself
+    wait = integration.supports_batch and _rate_limit_wait(self, integration)
+    if wait:
+        raise self.retry(countdown=wait)
 
-        try:
-            result = integration.execute(subscriber, audience_integration.settings)
+    if log_ids is None:
+        logs = [
+            IntegrationLog(
+                subscriber=subscriber,
+                integration=audience_integration.integration,
+                status="pending",
+            )
+            for subscriber in subscribers
+        ]
+        if not integration.idempotent:
+            logs = IntegrationLog.objects.bulk_create(logs)
+    else:
+        by_subscriber = {
+            log.subscriber_id: log
+            for log in IntegrationLog.objects.filter(id__in=log_ids)
+        }
+        logs = [by_subscriber[subscriber.id] for subscriber in subscribers]
+
+    try:
+        results = integration.execute_many(subscribers, audience_integration.settings)
+    except Exception as e:
+        results = [e] * len(subscribers)
+
+    retry_logs = []
+    deferred_logs = []
+    deferred_for = 0
+    for log, result in zip(logs, results):
+        if isinstance(result, RateLimited) and not self.request.is_eager:
+            # Not called: deferred without counting as an attempt
+            deferred_logs.append(log)
+            deferred_for = max(deferred_for, result.retry_in)
+        elif isinstance(result, Exception):
+            log.error_message = str(result)
+            if is_transient(result):
+                retry_logs.append(log)
+            else:
+                log.status = "failed"
+        else:
             log.status = "success"
             log.response_data = result
-        except Exception as e:
+
+    if retry_logs:
+        breaker.record_failure()
+    elif any(log.status == "success" for log in logs):
+        breaker.record_success()
+
+    if not _should_retry(self, attempt):
+        for log in retry_logs:
             log.status = "failed"
-            log.error_message = str(e)
+        retry_logs = []
+
+    _save_logs(logs)
+
+    if retry_logs or deferred_logs:
+        pending_logs = retry_logs + deferred_logs
+        raise self.retry(
+            args=(
+                [log.subscriber_id for log in pending_logs],
+                audience_integration_id,
+            ),
+            kwargs={
+                "attempt": attempt + 1 if retry_logs else attempt,
+                # Only logs written as pending are kept across retries
+                "log_ids": (
+                    [log.pk for log in pending_logs]
+                    if pending_logs[0].pk is not None
+                    else None
+                ),
+            },
+            countdown=max(backoff(attempt) if retry_logs else 0, deferred_for),
+        )
+
+
+@shared_task(ignore_result=True)
+def run_audience_integrations_async(pairs, queue=None):
+    """
+    Execute (subscriber, audience integration) pairs concurrently on one event
+    loop with aexecute(). Transient failures, rate-limited calls and pairs whose
+    circuit is open are handed over to run_audience_integration, which retries
+    or defers them, on `queue` if given (e.g. the replay queue) and otherwise on
+    the provider's queue.
+    """
+    subscribers = Subscriber.objects.select_related("audience", "source").in_bulk(
+        {subscriber_id for subscriber_id, _ in pairs}
+    )
+    audience_integrations = AudienceIntegration.objects.select_related(
+        "integration"
+    ).in_bulk({audience_integration_id for _, audience_integration_id in pairs})
+
+    # Eager (DEBUG) runs can't be deferred, see _circuit_open()
+    eager = run_audience_integrations_async.request.is_eager
+    calls = []
+    logs = []
+    open_circuits = set()
+    for subscriber_id, audience_integration_id in pairs:
+        subscriber = subscribers.get(subscriber_id)
+        audience_integration = audience_integrations.get(audience_integration_id)
+        if subscriber is None or audience_integration is None:
+            continue
+
+        integration = audience_integration.integration
+        breaker = CircuitBreaker(integration.id)
+        if integration.id in open_circuits or (not eager and not breaker.allow()):
+            open_circuits.add(integration.id)
+            run_audience_integration.apply_async(
+                (subscriber_id, audience_integration_id),
+                countdown=breaker.retry_in(),
+                **_task_options(integration.integration_type, queue),
+            )
+            continue
+
+        calls.append(
+            (_get_integration(integration), subscriber, audience_integration.settings)
+        )
+        logs.append(
+            IntegrationLog(
+                subscriber=subscriber, integration=integration, status="pending"
+            )
+        )
+
+    # Pending markers only for the providers that need them
+    IntegrationLog.objects.bulk_create(
+        [log for (provider, _, _), log in zip(calls, logs) if not provider.idempotent]
+    )
+    results = engine.execute_concurrently(calls)
+
+    retries = []
+    for log, result in zip(logs, results):
+        breaker = CircuitBreaker(log.integration_id)
+        if isinstance(result, RateLimited) and not eager:
+            # Not called: deferred without counting as an attempt
+            retries.append((log, 0, result.retry_in))
+            continue
+
+        if not isinstance(result, Exception):
+            breaker.record_success()
+            log.status = "success"
+            log.response_data = result
+            continue
+
+        log.error_message = str(result)
+        if is_transient(result):
+            breaker.record_failure()
+            if not eager:
+                retries.append((log, 1, backoff(0)))
+                continue
+        log.status = "failed"
+
+    _save_logs(logs)
+
+    by_integration = {
+        (audience_integration.audience_id, audience_integration.integration_id): (
+            audience_integration
+        )
+        for audience_integration in audience_integrations.values()
+    }
+    for log, attempt, countdown in retries:
+        audience_integration = by_integration[
+            (log.subscriber.audience_id, log.integration_id)
+        ]
+        run_audience_integration.apply_async(
+            (log.subscriber_id, audience_integration.id),
+            {"attempt": attempt, "log_id": log.pk},
+            countdown=countdown,
+            **_task_options(log.integration.integration_type, queue),
+        )
+
+
+@shared_task
+def process_subscriber_integrations(subscriber_id):
+    _fan_out([subscriber_id])
+
+
+@shared_task
+def process_subscribers_integrations(subscriber_ids):
+    """Batched variant of process_subscriber_integrations for several subscribers."""
+    _fan_out(subscriber_ids)
+
+
+@shared_task
+def flush_integration_dispatch():
+    """Dispatch the subscriber ids coalesced during an INTEGRATION_DISPATCH_WINDOW."""
+    dispatch.flush_window()
+
+
+@shared_task(ignore_result=True)
+def flush_integration_batch(integration_id):
+    """Run the subscribers collected for a batching Integration, per audience."""
+    audience_integrations = AudienceIntegration.objects.select_related(
+        "integration"
+    ).in_bulk(
+        AudienceIntegration.objects.filter(
+            integration_id=integration_id, is_active=True
+        ).values_list("id", flat=True)
+    )
+
+    for batches in batching.flush(integration_id):
+        for audience_integration_id, subscriber_ids in batches.items():
+            # Skip audience integrations deleted or disabled since
+            audience_integration = audience_integrations.get(audience_integration_id)
+            if audience_integration is None:
+                continue
+            run_audience_integration_batch.apply_async(
+                (subscriber_ids, audience_integration_id),
+                **_task_options(audience_integration.integration.integration_type),
+            )
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def send_integration_digest(
+    self, audience_integration_id, subscriber_ids=None, attempt=0, log_ids=None
+):
+    """
+    Send one summary notification for the subscribers collected by a digest
+    audience integration, and log it for each of them. Transient errors are
+    retried with the same subscribers, like run_audience_integration does.
+    """
+    audience_integration = (
+        AudienceIntegration.objects.select_related("integration")
+        .filter(id=audience_integration_id)
+        .first()
+    )
+    if audience_integration is None:
+        if subscriber_ids is None:
+            digest.discard(audience_integration_id)
+        return
+
+    if subscriber_ids is None:
+        subscriber_ids = digest.pop(audience_integration)
+        if not subscriber_ids:
+            return
+        # A full digest may leave more subscribers behind
+        if len(subscriber_ids) >= digest.get_size(audience_integration):
+            send_integration_digest.apply_async(
+                (audience_integration_id,),
+                **_task_options(audience_integration.integration.integration_type),
+            )
+
+    breaker = CircuitBreaker(audience_integration.integration_id)
+    if _circuit_open(self, breaker):
+        raise self.retry(
+            kwargs={
+                "subscriber_ids": subscriber_ids,
+                "attempt": attempt,
+                "log_ids": log_ids,
+            },
+            countdown=breaker.retry_in(),
+        )
+
+    subscribers = list(
+        Subscriber.objects.filter(id__in=subscriber_ids)
+        .select_related("audience", "source")
+        .order_by("id")
+    )
+    if not subscribers:
+        return
+
+    integration = _get_integration(audience_integration.integration)
+
+    wait = _rate_limit_wait(self, integration)
+    if wait:
+        raise self.retry(
+            kwargs={
+                "subscriber_ids": subscriber_ids,
+                "attempt": attempt,
+                "log_ids": log_ids,
+            },
+            countdown=wait,
+        )
+
+    if log_ids is None:
+        logs = [
+            IntegrationLog(
+                subscriber=subscriber,
+                integration=audience_integration.integration,
+                status="pending",
+            )
+            for subscriber in subscribers
+        ]
+        if not integration.idempotent:
+            logs = IntegrationLog.objects.bulk_create(logs)
+    else:
+        logs = list(IntegrationLog.objects.filter(id__in=log_ids))
+
+    status = "failed"
+    response_data = None
+    error_message = ""
+    try:
+        response_data = integration.execute_digest(
+            subscribers, audience_integration.settings
+        )
+        breaker.record_success()
+        status = "success"
+    except Exception as e:
+        error_message = str(e)
+        if is_transient(e):
+            breaker.record_failure()
+            if _should_retry(self, attempt):
+                status = "pending"
+
+    for log in logs:
+        log.status = status
+        log.response_data = response_data
+        log.error_message = error_message
+
+    _save_logs(logs)
+
+    if status == "pending":
+        raise self.retry(
+            kwargs={
+                "subscriber_ids": [subscriber.id for subscriber in subscribers],
+                "attempt": attempt + 1,
+                # Only logs written as pending are kept across retries
+                "log_ids": [log.pk for log in logs] if logs[0].pk else None,
+            },
+            countdown=backoff(attempt),
+        )
+
+
+@shared_task
+def flush_integration_digests():
+    """Send the digests whose window has ended (run periodically by beat)."""
+    due = digest.due()
+    audience_integrations = AudienceIntegration.objects.select_related(
+        "integration"
+    ).in_bulk(due)
+
+    for audience_integration_id in due:
+        audience_integration = audience_integrations.get(audience_integration_id)
+        options = (
+            _task_options(audience_integration.integration.integration_type)
+            if audience_integration
+            else {}
+        )
+        send_integration_digest.apply_async((audience_integration_id,), **options)
+
+
+@shared_task(bind=True, ignore_result=True)
+def replay_integrations(self, replay_id):
+    """
+    Queue the next chunks of a replay (see replay.start()), then run again once
+    its concurrency or rate allows more, until all of them are done.
+    """
+    # Eager (DEBUG) runs can't be deferred, the chunks run inline
+    countdown = replay.advance(replay_id, block=self.request.is_eager)
+    if countdown is not None:
+        replay_integrations.apply_async(
+            (replay_id,),
+            countdown=countdown,
+            queue=settings.INTEGRATION_REPLAY_QUEUE,
+        )
+
+
+@shared_task(ignore_result=True)
+def replay_integration_chunk(replay_id, subscriber_ids):
+    """
+    Run the integrations of a chunk of replayed subscribers concurrently, in
+    this task, like run_audience_integrations_async does. The chunk is skipped
+    if its replay was cancelled.
+    """
+    state = replay.get(replay_id)
+    if state is None:
+        return
+
+    pairs = []
+    try:
+        if state["status"] == "running":
+            pairs = replay.get_pairs(state, subscriber_ids)
+            # Retries stay on the replay queue, away from new submissions
+            run_audience_integrations_async(
+                pairs, queue=settings.INTEGRATION_REPLAY_QUEUE
+            )
+    finally:
+        replay.chunk_done(replay_id, len(subscriber_ids), len(pairs))
+
+
+@shared_task(ignore_result=True)
+def maintain_integration_logs():
+    """
+    Create upcoming IntegrationLog partitions and enforce the log retention
+    (run periodically by beat).
+    """
+    if not partitions.is_partitioned():
+        deleted = partitions.delete_expired()
+        if deleted:
+            logger.info(f"Deleted {deleted} expired integration logs")
+        return
 
-        log.save()
+    for name in partitions.ensure_partitions():
+        logger.info(f"Created integration log partition {name}")
+    for name in partitions.drop_expired():
+        logger.info(f"Dropped expired integration log partition {name}")